@@ -1,47 +1,61 @@
 """The loqed integration."""
 from __future__ import annotations
 
+import asyncio
 import logging
-import re
 
-from loqedAPI import loqed
+import aiohttp
 
+from homeassistant.components import webhook
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
+from homeassistant.const import CONF_WEBHOOK_ID, Platform
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN
-from .coordinator import LoqedDataCoordinator
+from .const import DOMAIN, JOURNAL_SNAPSHOT_INTERVAL
+from .coordinator import LoqedDataCoordinator, journal_store
+from .services import async_setup_services
 
 PLATFORMS: list[str] = [Platform.LOCK, Platform.SENSOR]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
 
 _LOGGER = logging.getLogger(__name__)
 
 
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the loqed services."""
+    async_setup_services(hass)
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up loqed from a config entry."""
-    websession = async_get_clientsession(hass)
-    host = entry.data["bridge_ip"]
-    apiclient = loqed.APIClient(websession, f"http://{host}")
-    api = loqed.LoqedAPI(apiclient)
+    coordinator = LoqedDataCoordinator(hass, entry)
+    await coordinator.async_config_entry_first_refresh()
+    # Restore the journal before webhooks can add events to it
+    await coordinator.async_load_journal()
+
     try:
-        lock = await api.async_get_lock(
-            entry.data["lock_key_key"],
-            entry.data["bridge_key"],
-            int(entry.data["lock_key_local_id"]),
-            re.sub(r"LOQED-([a-f0-9]+)\.local", r"\1", entry.data["bridge_mdns_hostname"]),
-        )
+        await coordinator.ensure_webhooks()
     except (
         asyncio.TimeoutError,
         aiohttp.ClientError,
     ) as ex:
-        raise ConfigEntryNotReady(f"Unable to connect to bridge at {host}") from ex
-    coordinator = LoqedDataCoordinator(hass, api, lock, entry)
-    await coordinator.ensure_webhooks()
-
-    await coordinator.async_config_entry_first_refresh()
+        webhook.async_unregister(hass, entry.data[CONF_WEBHOOK_ID])
+        raise ConfigEntryNotReady(
+            f"Unable to connect to bridge at {coordinator.client.ip_address}"
+        ) from ex
+
+    entry.async_on_unload(
+        async_track_time_interval(
+            hass, coordinator.async_save_journal, JOURNAL_SNAPSHOT_INTERVAL
+        )
+    )
 
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
 
@@ -56,6 +70,15 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         hass.data[DOMAIN].pop(entry.entry_id)
 
+    # Write what is only held in memory first, removing the webhook fails when
+    # the bridge is offline
+    await coordinator.async_save_journal()
+    await coordinator.async_stop_recording()
     await coordinator.remove_webhooks()
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored journal of a config entry that is removed."""
+    await journal_store(hass, entry.entry_id).async_remove()
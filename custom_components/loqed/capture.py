@@ -0,0 +1,217 @@
+"""Record and replay the traffic between a LOQED bridge and the integration."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterator
+from datetime import datetime
+import math
+import os
+import statistics
+import struct
+from time import monotonic, time
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util.aiohttp import MockRequest
+
+from .const import CAPTURE_FLUSH_INTERVAL
+from .loqed import HASH_HEADER_NAME, TIMESTAMP_HEADER_NAME, StatusMessage
+
+if TYPE_CHECKING:
+    from .coordinator import LoqedDataCoordinator
+
+CAPTURE_MAGIC = b"LQCAP1\n"
+KIND_WEBHOOK = b"W"
+KIND_STATUS = b"S"
+
+# kind, arrival time, length of the signature header, length of the body
+RECORD_HEADER = struct.Struct("<cdHI")
+
+
+class CaptureRecord(NamedTuple):
+    """A webhook request or status response read from a capture."""
+
+    kind: bytes
+    arrival: float
+    timestamp: str
+    hash: str
+    body: bytes
+
+
+class CaptureRecorder:
+    """Append-only recorder of webhook requests and status responses.
+
+    Records are buffered in memory and written to the capture file in the
+    executor every `CAPTURE_FLUSH_INTERVAL` and when recording stops.
+    """
+
+    def __init__(self, hass: HomeAssistant, path: str) -> None:
+        """Initialize the recorder."""
+        self.hass = hass
+        self.path = path
+        self.records = 0
+        self._buffer = bytearray()
+        self._lock = asyncio.Lock()
+        self._unsub_flush: CALLBACK_TYPE | None = None
+
+    def _append(self, kind: bytes, signature: bytes, body: bytes) -> None:
+        self._buffer += RECORD_HEADER.pack(kind, time(), len(signature), len(body))
+        self._buffer += signature
+        self._buffer += body
+        self.records += 1
+
+    def record_webhook(self, timestamp: str, message_hash: str, body: bytes) -> None:
+        """Record a signed webhook request."""
+        self._append(KIND_WEBHOOK, f"{timestamp}\n{message_hash}".encode(), body)
+
+    def record_status(self, body: bytes) -> None:
+        """Record the body of a status response."""
+        self._append(KIND_STATUS, b"", body)
+
+    @callback
+    def async_start(self) -> None:
+        """Start writing the recorded traffic periodically."""
+        self._unsub_flush = async_track_time_interval(
+            self.hass, self._async_flush, CAPTURE_FLUSH_INTERVAL
+        )
+
+    async def async_stop(self) -> None:
+        """Stop the periodic writes and write what is left."""
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        await self._async_flush()
+
+    async def _async_flush(self, _now: datetime | None = None) -> None:
+        """Write the buffered records to the capture file."""
+        async with self._lock:
+            if not self._buffer:
+                return
+            data = bytes(self._buffer)
+            self._buffer.clear()
+            await self.hass.async_add_executor_job(self._write, data)
+
+    def _write(self, data: bytes) -> None:
+        with open(self.path, "a+b") as file:
+            if file.seek(0, os.SEEK_END) == 0:
+                file.write(CAPTURE_MAGIC)
+            else:
+                file.seek(0)
+                if file.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+                    raise ValueError(f"{self.path} is not a LOQED capture file")
+            file.write(data)
+
+
+def prepare_capture_file(path: str) -> None:
+    """Create the directory of a capture file and check an existing file.
+
+    Raises ValueError when a file that is not a capture exists at the path, so
+    recording does not append to it.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        with open(path, "rb") as file:
+            header = file.read(len(CAPTURE_MAGIC))
+    except FileNotFoundError:
+        return
+    if header and header != CAPTURE_MAGIC:
+        raise ValueError(f"{path} is not a LOQED capture file")
+
+
+def read_capture(data: bytes) -> Iterator[CaptureRecord]:
+    """Return the records in the contents of a capture file."""
+    if not data.startswith(CAPTURE_MAGIC):
+        raise ValueError("Not a LOQED capture file")
+    offset = len(CAPTURE_MAGIC)
+    while offset < len(data):
+        if len(data) - offset < RECORD_HEADER.size:
+            raise ValueError("Truncated capture")
+        kind, arrival, signature_length, body_length = RECORD_HEADER.unpack_from(
+            data, offset
+        )
+        offset += RECORD_HEADER.size
+        if len(data) - offset < signature_length + body_length:
+            raise ValueError("Truncated capture")
+        signature = data[offset : offset + signature_length].decode()
+        offset += signature_length
+        body = data[offset : offset + body_length]
+        offset += body_length
+        timestamp, _, message_hash = signature.partition("\n")
+        yield CaptureRecord(kind, arrival, timestamp, message_hash, body)
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    """Return a percentile of sorted values using the nearest rank."""
+    return values[max(0, math.ceil(len(values) * percentile / 100) - 1)]
+
+
+async def async_replay(
+    coordinator: LoqedDataCoordinator,
+    records: list[CaptureRecord],
+    speed: float,
+) -> dict[str, Any]:
+    """Feed recorded traffic to a replica of a coordinator and report how it performed.
+
+    The replica has its own client, journal and state, so the replay does not
+    change the lock or its journal, and real webhooks and commands keep using
+    the real clock. The clock of the replica returns the arrival time of the
+    record being handled, so signatures pass the `ALLOWED_DRIFT` check. With a
+    `speed` of 0 records are replayed without waiting between them. Webhooks
+    that were not added to the journal of the replica, because their signature
+    or content was not accepted, are reported as rejected.
+    """
+    replica = coordinator.replica()
+    now = 0.0
+    replica.client.clock = lambda: now
+    revision = replica.journal.revision
+    latencies: list[float] = []
+    webhooks = 0
+    start = monotonic()
+    try:
+        for index, record in enumerate(records):
+            if speed and index:
+                delay = record.arrival - records[index - 1].arrival
+                await asyncio.sleep(delay / speed)
+            now = record.arrival
+            handle_start = monotonic()
+            if record.kind == KIND_WEBHOOK:
+                webhooks += 1
+                await replica._handle_webhook(  # pylint: disable=protected-access
+                    replica.hass,
+                    replica.webhook_id,
+                    MockRequest(
+                        content=record.body,
+                        mock_source="replay",
+                        method="POST",
+                        headers={
+                            TIMESTAMP_HEADER_NAME: record.timestamp,
+                            HASH_HEADER_NAME: record.hash,
+                        },
+                    ),
+                )
+            else:
+                replica.data.update_status(StatusMessage.from_json(record.body))
+                replica.async_set_updated_data(replica.data)
+            latencies.append(monotonic() - handle_start)
+    finally:
+        duration = monotonic() - start
+
+    latencies.sort()
+    return {
+        "events": len(records),
+        "webhooks": webhooks,
+        "rejected_webhooks": webhooks - (replica.journal.revision - revision),
+        "status_updates": len(records) - webhooks,
+        "duration": round(duration, 3),
+        "events_per_second": round(len(records) / duration, 1) if duration else None,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3),
+            "p50": round(_percentile(latencies, 50) * 1000, 3),
+            "p90": round(_percentile(latencies, 90) * 1000, 3),
+            "p99": round(_percentile(latencies, 99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3),
+        }
+        if latencies
+        else None,
+    }
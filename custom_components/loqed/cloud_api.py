@@ -0,0 +1,29 @@
+"""Client for the LOQED cloud API."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from aiohttp import ClientSession
+
+CLOUD_API_URL = "https://integrations.production.loqed.com/api/"
+
+
+class LoqedCloudClient:
+    """
+    Client for the LOQED cloud API
+    """
+
+    def __init__(self, session: ClientSession, api_token: str) -> None:
+        self._session = session
+        self._headers = {"Authorization": f"Bearer {api_token}"}
+
+    async def get_locks(self) -> dict[str, Any]:
+        """
+        Returns the locks the API token has access to
+        """
+        async with self._session.get(
+            f"{CLOUD_API_URL}locks/", headers=self._headers
+        ) as result:
+            result.raise_for_status()
+            return await result.json()
@@ -3,15 +3,13 @@ from __future__ import annotations
 
 import logging
 import re
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import aiohttp
-from loqedAPI import cloud_loqed, loqed
 import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.components import webhook
-from homeassistant.components.zeroconf import ZeroconfServiceInfo
 from homeassistant.const import CONF_API_TOKEN, CONF_NAME, CONF_WEBHOOK_ID
 from homeassistant.core import HomeAssistant
 from homeassistant.data_entry_flow import FlowResult
@@ -19,6 +17,10 @@ from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
 from .const import DOMAIN
+from .loqed import LoqedBridgeClient
+
+if TYPE_CHECKING:
+    from homeassistant.components.zeroconf import ZeroconfServiceInfo
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -37,13 +39,14 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         # 1. Checking loqed-connection
         try:
-            session = async_get_clientsession(hass)
-            cloud_api_client = cloud_loqed.CloudAPIClient(
-                session,
-                data[CONF_API_TOKEN],
+            # The cloud API is only used while setting up a lock
+            from .cloud_api import (  # pylint: disable=import-outside-toplevel
+                LoqedCloudClient,
             )
-            cloud_client = cloud_loqed.LoqedCloudAPI(cloud_api_client)
-            lock_data = await cloud_client.async_get_locks()
+
+            session = async_get_clientsession(hass)
+            cloud_client = LoqedCloudClient(session, data[CONF_API_TOKEN])
+            lock_data = await cloud_client.get_locks()
         except aiohttp.ClientError as err:
             _LOGGER.error("HTTP Connection error to loqed API")
             raise CannotConnect from err
@@ -55,17 +58,12 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 if lock["bridge_ip"] == self._host or lock["name"] == data.get("name")
             )
 
-            apiclient = loqed.APIClient(session, f"http://{selected_lock['bridge_ip']}")
-            api = loqed.LoqedAPI(apiclient)
-            lock = await api.async_get_lock(
-                selected_lock["backend_key"],
-                selected_lock["bridge_key"],
-                selected_lock["local_id"],
-                selected_lock["bridge_ip"],
+            client = LoqedBridgeClient(
+                session, selected_lock["bridge_ip"], selected_lock["bridge_key"]
             )
 
-            # checking getWebooks to check the bridgeKey
-            await lock.getWebhooks()
+            # checking the webhooks to check the bridge key
+            await client.get_all_webhooks()
             return {
                 "lock_key_key": selected_lock["key_secret"],
                 "bridge_key": selected_lock["bridge_key"],
@@ -88,13 +86,11 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         host = discovery_info.host
         self._host = host
 
-        session = async_get_clientsession(self.hass)
-        apiclient = loqed.APIClient(session, f"http://{host}")
-        api = loqed.LoqedAPI(apiclient)
-        lock_data = await api.async_get_lock_details()
+        client = LoqedBridgeClient(async_get_clientsession(self.hass), host)
+        lock_data = await client.get_lock_status()
 
         # Check if already exists
-        await self.async_set_unique_id(lock_data["bridge_mac_wifi"])
+        await self.async_set_unique_id(lock_data.bridge_mac_wifi)
         self._abort_if_unique_id_configured({"bridge_ip": host})
 
         return await self.async_step_user()
@@ -1,5 +1,24 @@
 """Constants for the loqed integration."""
-
+from datetime import timedelta
 
 DOMAIN = "loqed"
 CONF_CLOUDHOOK_URL = "cloudhook_url"
+
+# Webhooks do not report the signal strength, voltage and online status
+STATUS_UPDATE_INTERVAL = timedelta(minutes=1)
+
+JOURNAL_CAPACITY = 1024
+JOURNAL_SNAPSHOT_INTERVAL = timedelta(minutes=5)
+JOURNAL_STORAGE_VERSION = 1
+
+# Methods of the bridge client sending the lock commands, by command
+COMMAND_METHODS = {
+    "lock": "lock_lock",
+    "unlock": "latch_lock",
+    "open": "open_lock",
+}
+
+CAPTURE_FLUSH_INTERVAL = timedelta(seconds=10)
+# Captures are only read and written in this directory of the configuration
+CAPTURE_DIRECTORY = "loqed_captures"
+CAPTURE_SUFFIX = ".capture"
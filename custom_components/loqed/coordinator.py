@@ -1,93 +1,106 @@
 """Provides the coordinator for a LOQED lock."""
 import asyncio
+from collections.abc import Awaitable, Callable
+from copy import copy
+from datetime import datetime
+from functools import cached_property
 import logging
-from typing import TypedDict
+from time import time
+from typing import Any
 
 from aiohttp.web import Request
-from loqedAPI import loqed
 
-from homeassistant.components import cloud, webhook
+from homeassistant.components import webhook
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_NAME, CONF_WEBHOOK_ID
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.device_registry import CONNECTION_NETWORK_MAC, DeviceInfo
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
-from .const import CONF_CLOUDHOOK_URL, DOMAIN
+from .capture import CaptureRecorder
+from .const import (
+    CONF_CLOUDHOOK_URL,
+    DOMAIN,
+    JOURNAL_CAPACITY,
+    JOURNAL_STORAGE_VERSION,
+    STATUS_UPDATE_INTERVAL,
+)
+from .journal import LoqedEventJournal
+from .loqed import LockState, LoqedBridgeClient, LoqedException
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class BatteryMessage(TypedDict):
-    """Properties in a battery update message."""
-
-    mac_wifi: str
-    mac_ble: str
-    battery_type: str
-    battery_percentage: int
-
-
-class StateReachedMessage(TypedDict):
-    """Properties in a battery update message."""
-
-    requested_state: str
-    requested_state_numeric: int
-    event_type: str
-    key_local_id: int
-    mac_wifi: str
-    mac_ble: str
-
-
-class TransitionMessage(TypedDict):
-    """Properties in a battery update message."""
-
-    go_to_state: str
-    go_to_state_numeric: int
-    event_type: str
-    key_local_id: int
-    mac_wifi: str
-    mac_ble: str
-
-
-class StatusMessage(TypedDict):
-    """Properties returned by the status endpoint of the bridhge."""
-
-    battery_percentage: int
-    battery_type: str
-    battery_type_numeric: int
-    battery_voltage: float
-    bolt_state: str
-    bolt_state_numeric: int
-    bridge_mac_wifi: str
-    bridge_mac_ble: str
-    lock_online: int
-    webhooks_number: int
-    ip_address: str
-    up_timestamp: int
-    wifi_strength: int
-    ble_strength: int
-
-
-class LoqedDataCoordinator(DataUpdateCoordinator[StatusMessage]):
+class LoqedDataCoordinator(DataUpdateCoordinator[LockState]):
     """Data update coordinator for the loqed platform."""
 
-    def __init__(
-        self,
-        hass: HomeAssistant,
-        api: loqed.LoqedAPI,
-        lock: loqed.Lock,
-        entry: ConfigEntry,
-    ) -> None:
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
         """Initialize the Loqed Data Update coordinator."""
-        super().__init__(hass, _LOGGER, name="Loqed sensors")
-        self._api = api
+        super().__init__(
+            hass, _LOGGER, name="Loqed sensors", update_interval=STATUS_UPDATE_INTERVAL
+        )
         self._entry = entry
-        self.lock = lock
+        self.client = LoqedBridgeClient(
+            async_get_clientsession(hass),
+            entry.data["bridge_ip"],
+            entry.data["bridge_key"],
+            entry.data["lock_key_key"],
+            int(entry.data["lock_key_local_id"]),
+        )
         self.device_name = self._entry.data[CONF_NAME]
+        self.journal = LoqedEventJournal(JOURNAL_CAPACITY)
+        self._journal_store = journal_store(hass, entry.entry_id)
+        self._journal_saved_revision = 0
+        self.recorder: CaptureRecorder | None = None
+
+    @property
+    def entry_id(self) -> str:
+        """Return the id of the config entry of the lock."""
+        return self._entry.entry_id
+
+    @property
+    def webhook_id(self) -> str:
+        """Return the id of the webhook the bridge calls."""
+        return self._entry.data[CONF_WEBHOOK_ID]
+
+    @property
+    def lock_id(self) -> str:
+        """Return the id of the lock, which is the MAC address of the bridge."""
+        return self.data.lock_id
+
+    @cached_property
+    def device_info(self) -> DeviceInfo:
+        """Return the device info shared by all entities of the lock."""
+        return DeviceInfo(
+            identifiers={(DOMAIN, self.lock_id)},
+            manufacturer="LOQED",
+            name=self.device_name,
+            model="Touch Smart Lock",
+            connections={(CONNECTION_NETWORK_MAC, self.lock_id)},
+        )
+
+    def replica(self) -> "LoqedDataCoordinator":
+        """Return a copy of the coordinator that no entity or webhook uses.
 
-    async def _async_update_data(self) -> StatusMessage:
+        The copy has its own client, journal and state, so traffic fed to it
+        does not change the lock, its journal or a running recording. It does
+        not poll the bridge.
+        """
+        replica = LoqedDataCoordinator(self.hass, self._entry)
+        replica.update_interval = None
+        replica.data = copy(self.data)
+        return replica
+
+    async def _async_update_data(self) -> LockState:
         """Fetch data from API endpoint."""
         async with asyncio.timeout(10):
-            return await self._api.async_get_lock_details()
+            status = await self.client.get_lock_status()
+        if self.data is None:
+            return LockState(status)
+        self.data.update_status(status)
+        return self.data
 
     async def _handle_webhook(
         self, hass: HomeAssistant, webhook_id: str, request: Request
@@ -96,16 +109,68 @@ class LoqedDataCoordinator(DataUpdateCoordinator[StatusMessage]):
         _LOGGER.debug("Callback received: %s", request.headers)
         received_ts = request.headers["TIMESTAMP"]
         received_hash = request.headers["HASH"]
-        body = await request.text()
+        body = await request.content.read()
 
         _LOGGER.debug("Callback body: %s", body)
 
-        event_data = await self.lock.receiveWebhook(body, received_hash, received_ts)
-        if "error" in event_data:
-            _LOGGER.warning("Incorrect callback received:: %s", event_data)
+        if self.recorder is not None:
+            self.recorder.record_webhook(received_ts, received_hash, body)
+
+        try:
+            event_data = self.client.parse_webhook(body, received_ts, received_hash)
+        except LoqedException as err:
+            _LOGGER.warning("Incorrect callback received: %s", err)
             return
 
-        self.async_update_listeners()
+        now = time()
+        if (event_type := self.data.update_webhook(event_data, now)) is None:
+            _LOGGER.warning("Callback with unknown content received: %s", event_data)
+            return
+        self.journal.append(
+            event_type,
+            event_data.get("key_local_id"),
+            event_data.get("requested_state") or event_data.get("go_to_state"),
+            now,
+        )
+        self.async_set_updated_data(self.data)
+
+    async def async_load_journal(self) -> None:
+        """Restore the event journal from the last stored snapshot."""
+        if data := await self._journal_store.async_load():
+            self.journal.restore(data)
+        self._journal_saved_revision = self.journal.revision
+
+    async def async_save_journal(self, _now: datetime | None = None) -> None:
+        """Store a snapshot of the event journal when it has changed."""
+        if self.journal.revision == self._journal_saved_revision:
+            return
+        self._journal_saved_revision = self.journal.revision
+        await self._journal_store.async_save(self.journal.as_dict())
+
+    @callback
+    def async_set_webhook_handler(
+        self,
+        handler: Callable[[HomeAssistant, str, Request], Awaitable[None]],
+    ) -> None:
+        """Replace the handler registered for the webhook of the bridge."""
+        webhook.async_unregister(self.hass, self.webhook_id)
+        webhook.async_register(self.hass, DOMAIN, "Loqed", self.webhook_id, handler)
+
+    @callback
+    def async_start_recording(self, path: str) -> None:
+        """Start recording webhook requests and status responses to a file."""
+        self.recorder = CaptureRecorder(self.hass, path)
+        self.client.on_status = self.recorder.record_status
+        self.recorder.async_start()
+
+    async def async_stop_recording(self) -> CaptureRecorder | None:
+        """Stop recording and return the recorder that was active."""
+        if (recorder := self.recorder) is None:
+            return None
+        self.recorder = None
+        self.client.on_status = None
+        await recorder.async_stop()
+        return recorder
 
     async def ensure_webhooks(self) -> None:
         """Register webhook on LOQED bridge."""
@@ -115,7 +180,7 @@ class LoqedDataCoordinator(DataUpdateCoordinator[StatusMessage]):
             self.hass, DOMAIN, "Loqed", webhook_id, self._handle_webhook
         )
 
-        if cloud.async_active_subscription(self.hass):
+        if _async_cloud_active(self.hass):
             webhook_url = await async_cloudhook_generate_url(self.hass, self._entry)
         else:
             webhook_url = webhook.async_generate_url(
@@ -124,15 +189,15 @@ class LoqedDataCoordinator(DataUpdateCoordinator[StatusMessage]):
 
         _LOGGER.debug("Webhook URL: %s", webhook_url)
 
-        webhooks = await self.lock.getWebhooks()
+        webhooks = await self.client.get_all_webhooks()
 
         webhook_index = next(
             (x["id"] for x in webhooks if x["url"] == webhook_url), None
         )
 
         if not webhook_index:
-            await self.lock.registerWebhook(webhook_url)
-            webhooks = await self.lock.getWebhooks()
+            await self.client.setup_webhook(webhook_url)
+            webhooks = await self.client.get_all_webhooks()
             webhook_index = next(x["id"] for x in webhooks if x["url"] == webhook_url)
 
             _LOGGER.debug("Webhook got index %s", webhook_index)
@@ -152,19 +217,40 @@ class LoqedDataCoordinator(DataUpdateCoordinator[StatusMessage]):
         )
         _LOGGER.debug("Webhook URL: %s", webhook_url)
 
-        webhooks = await self.lock.getWebhooks()
+        webhooks = await self.client.get_all_webhooks()
 
         webhook_index = next(
             (x["id"] for x in webhooks if x["url"] == webhook_url), None
         )
 
         if webhook_index:
-            await self.lock.deleteWebhook(webhook_index)
+            await self.client.remove_webhook(webhook_index)
+
+
+def journal_store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+    """Return the store holding the journal snapshot of a config entry."""
+    return Store(hass, JOURNAL_STORAGE_VERSION, f"{DOMAIN}.journal.{entry_id}")
+
+
+def _async_cloud_active(hass: HomeAssistant) -> bool:
+    """Return if Home Assistant Cloud is loaded and has an active subscription."""
+    if "cloud" not in hass.config.components:
+        return False
+    # Only import cloud when it is set up, importing it pulls in a lot of modules
+    from homeassistant.components import (  # pylint: disable=import-outside-toplevel
+        cloud,
+    )
+
+    return cloud.async_active_subscription(hass)
 
 
 async def async_cloudhook_generate_url(hass: HomeAssistant, entry: ConfigEntry) -> str:
     """Generate the full URL for a webhook_id."""
     if CONF_CLOUDHOOK_URL not in entry.data:
+        from homeassistant.components import (  # pylint: disable=import-outside-toplevel
+            cloud,
+        )
+
         webhook_url = await cloud.async_create_cloudhook(
             hass, entry.data[CONF_WEBHOOK_ID]
         )
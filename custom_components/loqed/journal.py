@@ -0,0 +1,163 @@
+"""In-memory event journal for a LOQED lock."""
+from __future__ import annotations
+
+from array import array
+from collections import deque
+from time import time
+from typing import Any, NamedTuple
+
+NO_KEY = -1
+
+
+class JournalEvent(NamedTuple):
+    """A single event stored in the journal."""
+
+    timestamp: float
+    event_type: str
+    key_local_id: int | None
+    state: str | None
+
+
+class LoqedEventJournal:
+    """Fixed-size ring buffer of lock events with secondary indexes.
+
+    Events are stored column-wise in typed arrays that grow up to `capacity`,
+    strings are interned in a small lookup table and the per-key and
+    per-event-type indexes hold sequence numbers, so a query only visits
+    matching events.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """Initialize an empty journal holding at most `capacity` events."""
+        self.capacity = capacity
+        self._timestamps = array("d")
+        self._key_ids = array("h")
+        self._event_types = array("H")
+        self._states = array("H")
+        self._strings: list[str | None] = [None]
+        self._string_ids: dict[str | None, int] = {None: 0}
+        self._by_key: dict[int, deque[int]] = {}
+        self._by_type: dict[int, deque[int]] = {}
+        self._seq = 0
+
+    def __len__(self) -> int:
+        """Return the number of events currently held."""
+        return min(self._seq, self.capacity)
+
+    @property
+    def revision(self) -> int:
+        """Return a counter that changes whenever an event is added."""
+        return self._seq
+
+    def _intern(self, value: str | None) -> int:
+        """Return the table index for a string, adding it when unknown."""
+        if (index := self._string_ids.get(value)) is None:
+            index = self._string_ids[value] = len(self._strings)
+            self._strings.append(value)
+        return index
+
+    def append(
+        self,
+        event_type: str,
+        key_local_id: int | None = None,
+        state: str | None = None,
+        timestamp: float | None = None,
+    ) -> None:
+        """Add an event, overwriting the oldest one when the journal is full."""
+        seq = self._seq
+        slot = seq % self.capacity
+        type_id = self._intern(event_type)
+        key_id = NO_KEY if key_local_id is None else int(key_local_id)
+        timestamp = time() if timestamp is None else timestamp
+        state_id = self._intern(state)
+
+        if seq < self.capacity:
+            self._timestamps.append(timestamp)
+            self._key_ids.append(key_id)
+            self._event_types.append(type_id)
+            self._states.append(state_id)
+        else:
+            self._timestamps[slot] = timestamp
+            self._key_ids[slot] = key_id
+            self._event_types[slot] = type_id
+            self._states[slot] = state_id
+
+        if key_id != NO_KEY:
+            self._index(self._by_key, key_id).append(seq)
+        self._index(self._by_type, type_id).append(seq)
+        self._seq = seq + 1
+
+    def _index(self, index: dict[int, deque[int]], value: int) -> deque[int]:
+        """Return the sequence list for an index value."""
+        if (seqs := index.get(value)) is None:
+            seqs = index[value] = deque(maxlen=self.capacity)
+        return seqs
+
+    def _event(self, seq: int) -> JournalEvent:
+        """Return the event stored for a sequence number."""
+        slot = seq % self.capacity
+        key_id = self._key_ids[slot]
+        return JournalEvent(
+            self._timestamps[slot],
+            self._strings[self._event_types[slot]],  # type: ignore[arg-type]
+            None if key_id == NO_KEY else key_id,
+            self._strings[self._states[slot]],
+        )
+
+    def query(
+        self,
+        key_local_id: int | None = None,
+        event_type: str | None = None,
+        since: float | None = None,
+        limit: int | None = None,
+    ) -> list[JournalEvent]:
+        """Return matching events, newest first."""
+        oldest = self._seq - len(self)
+        candidates: list[deque[int]] = []
+
+        if key_local_id is not None:
+            if (by_key := self._by_key.get(key_local_id)) is None:
+                return []
+            candidates.append(by_key)
+        type_id = None
+        if event_type is not None:
+            if (type_id := self._string_ids.get(event_type)) is None:
+                return []
+            if (by_type := self._by_type.get(type_id)) is None:
+                return []
+            candidates.append(by_type)
+
+        seqs = (
+            reversed(min(candidates, key=len))
+            if candidates
+            else range(self._seq - 1, oldest - 1, -1)
+        )
+
+        result: list[JournalEvent] = []
+        for seq in seqs:
+            if seq < oldest:
+                break
+            slot = seq % self.capacity
+            if since is not None and self._timestamps[slot] < since:
+                break
+            if type_id is not None and self._event_types[slot] != type_id:
+                continue
+            if key_local_id is not None and self._key_ids[slot] != key_local_id:
+                continue
+            result.append(self._event(seq))
+            if limit is not None and len(result) >= limit:
+                break
+        return result
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a snapshot of the journal that can be stored as JSON."""
+        return {
+            "events": [
+                list(self._event(seq)) for seq in range(self._seq - len(self), self._seq)
+            ]
+        }
+
+    def restore(self, data: dict[str, Any]) -> None:
+        """Load events from a snapshot created by `as_dict`."""
+        for timestamp, event_type, key_local_id, state in data.get("events", []):
+            self.append(event_type, key_local_id, state, timestamp)
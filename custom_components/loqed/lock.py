@@ -12,11 +12,14 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from . import LoqedDataCoordinator
 from .const import DOMAIN
 from .entity import LoqedEntity
+from .loqed import BoltState
 
 WEBHOOK_API_ENDPOINT = "/api/loqed/webhook"
 
 _LOGGER = logging.getLogger(__name__)
 
+LOCKED_STATES = frozenset((BoltState.NIGHT_LOCK, BoltState.NIGHT_LOCK_REMOTE))
+
 
 async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
@@ -35,51 +38,48 @@ class LoqedLock(LoqedEntity, LockEntity):
     def __init__(self, coordinator: LoqedDataCoordinator) -> None:
         """Initialize the lock."""
         super().__init__(coordinator)
-        self._lock = coordinator.lock
-        self._attr_unique_id = self._lock.id
+        self._attr_unique_id = coordinator.lock_id
         self._attr_name = None
 
     @property
     def changed_by(self) -> str:
         """Return internal ID of last used key."""
-        return f"KeyID {self._lock.last_key_id}"
+        return f"KeyID {self.coordinator.data.last_key_id}"
 
     @property
     def is_locking(self) -> bool | None:
         """Return true if lock is locking."""
-        return self._lock.bolt_state == "locking"
+        return self.coordinator.data.bolt_state is BoltState.LOCKING
 
     @property
     def is_unlocking(self) -> bool | None:
         """Return true if lock is unlocking."""
-        return self._lock.bolt_state == "unlocking"
+        return self.coordinator.data.bolt_state is BoltState.UNLOCKING
 
     @property
     def is_jammed(self) -> bool | None:
         """Return true if lock is jammed."""
-        return self._lock.bolt_state == "motor_stall"
+        return self.coordinator.data.bolt_state is BoltState.MOTOR_STALL
 
     @property
     def is_locked(self) -> bool | None:
         """Return true if lock is locked."""
-        return self._lock.bolt_state in ["night_lock_remote", "night_lock"]
+        return self.coordinator.data.bolt_state in LOCKED_STATES
 
     async def async_lock(self, **kwargs: Any) -> None:
         """Lock the lock."""
-        await self._lock.lock()
+        await self.coordinator.client.lock_lock()
 
     async def async_unlock(self, **kwargs: Any) -> None:
         """Unlock the lock."""
-        await self._lock.unlock()
+        await self.coordinator.client.latch_lock()
 
     async def async_open(self, **kwargs: Any) -> None:
         """Open the door latch."""
-        await self._lock.open()
+        await self.coordinator.client.open_lock()
 
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         _LOGGER.debug(self.coordinator.data)
-        if "bolt_state" in self.coordinator.data:
-            self._lock.updateState(self.coordinator.data["bolt_state"]).close()
-            self.async_write_ha_state()
+        self.async_write_ha_state()
@@ -2,18 +2,26 @@
 
 from __future__ import annotations
 
+import asyncio
 import base64
-from enum import Enum
+from collections.abc import Callable
+from dataclasses import dataclass
+from enum import Enum, StrEnum
 import hashlib
 from hashlib import sha256
 import hmac
-import json
 import logging
 import struct
-from time import time
-import urllib
+from time import monotonic, time
+from typing import Any, TypedDict
+import urllib.parse
 
-from aiohttp import ClientSession
+from aiohttp import ClientError, ClientSession
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # pragma: no cover
+    from json import loads as json_loads
 
 DEFAULT_TIMEOUT = 5 * 60
 TIMESTAMP_HEADER_NAME = "timestamp"
@@ -21,11 +29,6 @@ HASH_HEADER_NAME = "hash"
 ALLOWED_DRIFT = 60
 WEBHOOK_ALL_EVENTS_FLAG = 511
 
-
-def _now_as_timestamp():
-    return int(time())
-
-
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -39,41 +42,365 @@ class ActionType(Enum):
     LOCK = 3
 
 
-class LoqedWebhookClient:
+class BatteryMessage(TypedDict):
+    """Properties in a battery update message."""
+
+    mac_wifi: str
+    mac_ble: str
+    battery_type: str
+    battery_percentage: int
+
+
+class BleStrengthMessage(TypedDict):
+    """Properties in a bluetooth signal strength message."""
+
+    mac_wifi: str
+    mac_ble: str
+    ble_strength: int
+
+
+class OnlineStatusMessage(TypedDict):
+    """Properties in an online status message."""
+
+    mac_wifi: str
+    mac_ble: str
+    lock_online: int
+
+
+class StateReachedMessage(TypedDict):
+    """Properties in a state reached message."""
+
+    requested_state: str
+    requested_state_numeric: int
+    event_type: str
+    key_local_id: int
+    mac_wifi: str
+    mac_ble: str
+
+
+class TransitionMessage(TypedDict):
+    """Properties in a transition message."""
+
+    go_to_state: str
+    go_to_state_numeric: int
+    event_type: str
+    key_local_id: int
+    mac_wifi: str
+    mac_ble: str
+
+
+WebhookMessage = (
+    BatteryMessage
+    | BleStrengthMessage
+    | OnlineStatusMessage
+    | StateReachedMessage
+    | TransitionMessage
+)
+
+
+class WebhookEntry(TypedDict):
+    """A webhook registered on the bridge."""
+
+    id: int
+    url: str
+
+
+class BoltState(StrEnum):
     """
-    Client for communicating with the Loqed local bridge
+    Represents the state of the bolt of the lock
+    """
+
+    OPEN = "open"
+    OPEN_REMOTE = "open_remote"
+    LATCH = "latch"
+    LATCH_REMOTE = "latch_remote"
+    DAY_LOCK = "day_lock"
+    NIGHT_LOCK = "night_lock"
+    NIGHT_LOCK_REMOTE = "night_lock_remote"
+    LOCKING = "locking"
+    UNLOCKING = "unlocking"
+    OPENING = "opening"
+    MOTOR_STALL = "motor_stall"
+    UNKNOWN = "unknown"
+
+
+BOLT_STATES = {state.value: state for state in BoltState}
+
+
+def parse_bolt_state(value: str) -> BoltState | str:
+    """
+    Returns the bolt state for a value reported by the bridge, values that are
+    not known are kept as they are
+    """
+    if (state := BOLT_STATES.get(value)) is None:
+        _LOGGER.debug("Unknown bolt state: %s", value)
+        return value
+    return state
+
+
+# Bolt state shown while the lock moves towards the target state named in the
+# event type of a transition message, checked in this order
+TRANSITION_STATES = {
+    "night_lock": BoltState.LOCKING,
+    "open": BoltState.OPENING,
+    "latch": BoltState.UNLOCKING,
+}
+STATE_CHANGED_PREFIX = "state_changed_"
+
+
+@dataclass(frozen=True, slots=True)
+class StatusMessage:
+    """Snapshot of the properties returned by the status endpoint of the bridge."""
+
+    battery_percentage: int
+    battery_type: str
+    battery_type_numeric: int
+    battery_voltage: float
+    bolt_state: BoltState | str
+    bolt_state_numeric: int
+    bridge_mac_wifi: str
+    bridge_mac_ble: str
+    lock_online: int
+    webhooks_number: int
+    ip_address: str
+    up_timestamp: int
+    wifi_strength: int
+    ble_strength: int
+
+    @classmethod
+    def from_json(cls, body: bytes) -> StatusMessage:
+        """
+        Decodes the body of a status response
+        """
+        data = json_loads(body)
+        return cls(
+            battery_percentage=data["battery_percentage"],
+            battery_type=data["battery_type"],
+            battery_type_numeric=data["battery_type_numeric"],
+            battery_voltage=data["battery_voltage"],
+            bolt_state=parse_bolt_state(data["bolt_state"]),
+            bolt_state_numeric=data["bolt_state_numeric"],
+            bridge_mac_wifi=data["bridge_mac_wifi"],
+            bridge_mac_ble=data["bridge_mac_ble"],
+            lock_online=data["lock_online"],
+            webhooks_number=data["webhooks_number"],
+            ip_address=data["ip_address"],
+            up_timestamp=data["up_timestamp"],
+            wifi_strength=data["wifi_strength"],
+            ble_strength=data["ble_strength"],
+        )
+
+
+class LockState:
+    """
+    Runtime state of a lock, shared by the lock and sensor entities.
+
+    Updated in place from status responses and webhook messages, so a lock
+    holds a single small object instead of a new snapshot per update.
+    """
+
+    __slots__ = (
+        "lock_id",
+        "bolt_state",
+        "battery_percentage",
+        "battery_type",
+        "battery_voltage",
+        "wifi_strength",
+        "ble_strength",
+        "lock_online",
+        "up_timestamp",
+        "last_key_id",
+        "last_event",
+    )
+
+    def __init__(self, status: StatusMessage) -> None:
+        self.lock_id = status.bridge_mac_wifi
+        self.last_key_id: int | None = None
+        self.last_event: float | None = None
+        self.update_status(status)
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+    def update_status(self, status: StatusMessage) -> None:
+        """
+        Applies the properties of a status response
+        """
+        self.bolt_state = status.bolt_state
+        self.battery_percentage = status.battery_percentage
+        self.battery_type = status.battery_type
+        self.battery_voltage = status.battery_voltage
+        self.wifi_strength = status.wifi_strength
+        self.ble_strength = status.ble_strength
+        self.lock_online = status.lock_online
+        self.up_timestamp = status.up_timestamp
+
+    def update_webhook(self, message: WebhookMessage, timestamp: float) -> str | None:
+        """
+        Applies the changes reported by a webhook message received at `timestamp`
+
+        Returns the type of the event the message describes, or None when the
+        message has a shape that is not known, in which case nothing changes
+        """
+        if "battery_percentage" in message:
+            self.battery_percentage = message["battery_percentage"]
+            self.battery_type = message.get("battery_type", self.battery_type)
+            event = "BATTERY"
+        elif "ble_strength" in message:
+            self.ble_strength = message["ble_strength"]
+            event = "BLE_STRENGTH"
+        elif "lock_online" in message:
+            self.lock_online = message["lock_online"]
+            event = "ONLINE_STATUS"
+        elif isinstance(event := message.get("event_type"), str):
+            self._update_bolt_state(event.strip().lower())
+            if "key_local_id" in message:
+                self.last_key_id = message["key_local_id"]
+        else:
+            return None
+        self.last_event = timestamp
+        return event
+
+    def _update_bolt_state(self, event_type: str) -> None:
+        if event_type.startswith(STATE_CHANGED_PREFIX):
+            # STATE_CHANGED_NIGHT_LOCK_REMOTE results in night_lock_remote
+            self.bolt_state = parse_bolt_state(
+                event_type.removeprefix(STATE_CHANGED_PREFIX)
+            )
+        else:
+            # Only show a transition when the lock is not in the target state yet
+            for target, transition in TRANSITION_STATES.items():
+                if target in event_type and target not in self.bolt_state:
+                    self.bolt_state = transition
+
+
+class LoqedBridgeClient:
+    """
+    Client for a Loqed bridge and the lock paired with it
+
+    Keys are decoded once when the client is created. All requests to the
+    bridge go through `_request`, which reports the duration of every request
+    to the `on_request` hook and retries idempotent requests `retries` times.
+    The raw body of every status response is passed to the `on_status` hook.
+    The status is cached for `status_cache_ttl` seconds and the webhook list
+    until a webhook is added or removed.
     """
 
     def __init__(
         self,
         session: ClientSession,
         ip_address: str,
-        api_key: str,
-        timeout=DEFAULT_TIMEOUT,
+        bridge_key: str | None = None,
+        lock_key: str | None = None,
+        local_key_id: int = 0,
+        *,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = 0,
+        status_cache_ttl: float = 0,
+        clock: Callable[[], float] = time,
+        on_request: Callable[[str, float], None] | None = None,
+        on_status: Callable[[bytes], None] | None = None,
     ) -> None:
         """
         :param ip_address: ip address of your loqed bridge
-        :param api_key: base64 encoded key of your bridge
+        :param bridge_key: base64 encoded key of your bridge
+        :param lock_key: base64 encoded secret of the key used to send commands
+        :param local_key_id: local id of the key used to send commands
+        :param clock: source of the current time used for signatures
         """
         self._session = session
         self._ip_address = ip_address
-        self._api_key = api_key
+        self._base_url = f"http://{ip_address}"
+        self._bridge_key = base64.b64decode(bridge_key) if bridge_key else b""
+        self._lock_key = base64.b64decode(lock_key) if lock_key else b""
+        self._local_key_id = local_key_id
         self._timeout = timeout
+        self.retries = retries
+        self.status_cache_ttl = status_cache_ttl
+        self.clock = clock
+        self.on_request = on_request
+        self.on_status = on_status
+        self._status: StatusMessage | None = None
+        self._status_time = 0.0
+        self._webhooks: list[WebhookEntry] | None = None
+
+    @property
+    def ip_address(self) -> str:
+        """
+        Returns the ip address of the bridge
+        """
+        return self._ip_address
+
+    def _now_as_timestamp(self) -> int:
+        return int(self.clock())
+
+    async def _request(
+        self, name: str, method: str, path: str, idempotent: bool = False, **kwargs: Any
+    ) -> bytes:
+        """
+        Sends a request to the bridge and returns the body of the response
+        """
+        attempts = self.retries + 1 if idempotent else 1
+        for attempt in range(attempts):
+            start = monotonic()
+            try:
+                async with self._session.request(
+                    method, f"{self._base_url}{path}", timeout=self._timeout, **kwargs
+                ) as result:
+                    body = await result.read()
+                    _LOGGER.debug("%s returned %d: %s", name, result.status, body)
+                    result.raise_for_status()
+                    return body
+            except (asyncio.TimeoutError, ClientError):
+                if attempt + 1 == attempts:
+                    raise
+                _LOGGER.debug("Retrying %s after failed attempt %d", name, attempt + 1)
+            finally:
+                if self.on_request is not None:
+                    self.on_request(name, monotonic() - start)
+        raise AssertionError("unreachable")
+
+    def _signed_headers(self, body: bytes) -> dict[str, str]:
+        now = self._now_as_timestamp()
+        return {
+            TIMESTAMP_HEADER_NAME: str(now),
+            HASH_HEADER_NAME: self.generate_signature(body, now),
+        }
+
+    async def get_lock_status(self) -> StatusMessage:
+        """
+        Gets the status of the lock
+        """
+        if (
+            self._status is not None
+            and monotonic() - self._status_time < self.status_cache_ttl
+        ):
+            return self._status
+        body = await self._request("status", "GET", "/status", idempotent=True)
+        if self.on_status is not None:
+            self.on_status(body)
+        # Loqed bridge incorrectly returns mimetype text/html, so we manually load here
+        status = StatusMessage.from_json(body)
+        if self.status_cache_ttl:
+            self._status = status
+            self._status_time = monotonic()
+        return status
 
     async def setup_webhook(
         self, callback_url: str, flags: int = WEBHOOK_ALL_EVENTS_FLAG
-    ) -> bool:
+    ) -> None:
         """
         Sets up a webhook for the given lock. Enables all events and calls the callbackUrl
         """
-        now = _now_as_timestamp()
-        signature = self.generate_signature(
-            callback_url.encode() + flags.to_bytes(4, "big"), now
-        )
-        result = await self._session.post(
-            f"http://{self._ip_address}/webhooks",
-            timeout=self._timeout,
-            headers={"timestamp": str(now), "hash": signature},
+        self._webhooks = None
+        await self._request(
+            "setup_webhook",
+            "POST",
+            "/webhooks",
+            headers=self._signed_headers(
+                callback_url.encode() + flags.to_bytes(4, "big")
+            ),
             json={
                 "url": callback_url,
                 "trigger_state_changed_open": flags & 1,
@@ -88,45 +415,36 @@ class LoqedWebhookClient:
             },
         )
 
-        _LOGGER.debug("Setup returned %d: %s", result.status, result.text)
-
-        return result.status == 200
-
-    async def remove_webhook(self, webhook_id: int) -> bool:
+    async def remove_webhook(self, webhook_id: int) -> None:
         """
         Removes a webhook for the given lock.
         """
-        now = _now_as_timestamp()
-        signature = self.generate_signature(webhook_id.to_bytes(8, "big"), now)
-        result = await self._session.delete(
-            f"http://{self._ip_address}/webhooks/{webhook_id}",
-            timeout=self._timeout,
-            headers={"timestamp": str(now), "hash": signature},
+        self._webhooks = None
+        await self._request(
+            "remove_webhook",
+            "DELETE",
+            f"/webhooks/{webhook_id}",
+            headers=self._signed_headers(webhook_id.to_bytes(8, "big")),
         )
 
-        _LOGGER.debug("Remove returned %d: %s", result.status, result.text)
-
-        return result.status == 200
-
-    async def get_all_webhooks(self):
+    async def get_all_webhooks(self) -> list[WebhookEntry]:
         """
         Returns all webhooks
         """
-        now = _now_as_timestamp()
-        signature = self.generate_signature(bytes(), now)
-        result = await self._session.get(
-            f"http://{self._ip_address}/webhooks",
-            timeout=self._timeout,
-            headers={"timestamp": str(now), "hash": signature},
-        )
-
-        # Loqed bridge incorrectly returns mimetype text/html, so we manually load here
-        body = await result.read()
-        return json.loads(body)
+        if self._webhooks is None:
+            body = await self._request(
+                "webhooks",
+                "GET",
+                "/webhooks",
+                idempotent=True,
+                headers=self._signed_headers(b""),
+            )
+            self._webhooks = json_loads(body)
+        return self._webhooks
 
     def validate_message(
         self,
-        body: str,
+        body: bytes,
         timestamp: int,
         message_hash: str,
         allow_all_times: bool = False,
@@ -134,64 +452,64 @@ class LoqedWebhookClient:
         """
         Validates the given body to have come from the configured bridge
         """
+        calculated_hash = self.generate_signature(body, timestamp)
 
-        calculated_hash = self.generate_signature(body.encode(), timestamp)
-
-        now = _now_as_timestamp()
+        now = self._now_as_timestamp()
 
-        return message_hash == calculated_hash and (
-            allow_all_times
-            or timestamp in range(now - ALLOWED_DRIFT, now + ALLOWED_DRIFT)
+        return hmac.compare_digest(message_hash, calculated_hash) and (
+            allow_all_times or now - ALLOWED_DRIFT <= timestamp < now + ALLOWED_DRIFT
         )
 
+    def parse_webhook(
+        self, body: bytes, timestamp: str, message_hash: str
+    ) -> WebhookMessage:
+        """
+        Validates and decodes a webhook message sent by the bridge
+        """
+        try:
+            valid = self.validate_message(body, int(timestamp), message_hash)
+        except ValueError:
+            valid = False
+        if not valid:
+            raise LoqedAuthenticationException("Invalid webhook signature")
+        try:
+            message = json_loads(body)
+        except ValueError as err:
+            raise LoqedException(f"Webhook body is not valid JSON: {err}") from err
+        if not isinstance(message, dict):
+            raise LoqedException("Webhook body is not a JSON object")
+        return message  # type: ignore[return-value]
+
     def generate_signature(self, body: bytes, timestamp: int) -> str:
         """
         Returns the signature for the requested message
         """
-        return sha256(
-            body + timestamp.to_bytes(8, "big") + base64.b64decode(self._api_key)
-        ).hexdigest()
-
-
-class LoqedLockClient:
-    """
-    Client for sending actions to the Loqed lock
-    """
-
-    def __init__(
-        self, session: ClientSession, ip_address: str, local_key_id: int, secret: str
-    ) -> None:
-        self._session = session
-        self._ip_address = ip_address
-        self._local_key_id = local_key_id
-        self._secret = secret
+        return sha256(body + timestamp.to_bytes(8, "big") + self._bridge_key).hexdigest()
 
     async def open_lock(self) -> None:
         """
         Open the provided lock
         """
-        result = await self._session.get(
-            f"http://{self._ip_address}/to_lock?command_signed_base64={self._get_command(ActionType.OPEN)}"
-        )
-        result.raise_for_status()
+        await self._send_command(ActionType.OPEN)
 
     async def lock_lock(self) -> None:
         """
         Locks the provided lock
         """
-        result = await self._session.get(
-            f"http://{self._ip_address}/to_lock?command_signed_base64={self._get_command(ActionType.LOCK)}"
-        )
-        result.raise_for_status()
+        await self._send_command(ActionType.LOCK)
 
     async def latch_lock(self) -> None:
         """
-        Locks the provided lock
+        Unlocks the provided lock
         """
-        result = await self._session.get(
-            f"http://{self._ip_address}/to_lock?command_signed_base64={self._get_command(ActionType.UNLOCK)}"
+        await self._send_command(ActionType.UNLOCK)
+
+    async def _send_command(self, action: ActionType) -> None:
+        await self._request(
+            action.name.lower(),
+            "GET",
+            f"/to_lock?command_signed_base64={self._get_command(action)}",
         )
-        result.raise_for_status()
 
     def _get_command(self, action: ActionType) -> str:
         """
@@ -207,7 +525,7 @@ class LoqedLockClient:
         local_key_id_bin = struct.pack("B", self._local_key_id)
         device_id_bin = struct.pack("B", device_id)
         action_bin = struct.pack("B", action.value)
-        now = int(time())
+        now = self._now_as_timestamp()
         timenow_bin = now.to_bytes(8, "big", signed=False)
         local_generated_binary_hash = (
             protocol_bin
@@ -218,7 +536,7 @@ class LoqedLockClient:
             + action_bin
         )
         command_hmac = hmac.new(
-            base64.b64decode(self._secret), local_generated_binary_hash, hashlib.sha256
+            self._lock_key, local_generated_binary_hash, hashlib.sha256
         ).digest()
         command = (
             message_id_bin
@@ -233,26 +551,13 @@ class LoqedLockClient:
         return urllib.parse.quote(base64.b64encode(command).decode("ascii"))
 
 
-class LoqedStatusClient:
+class LoqedException(Exception):
     """
-    Client for retrieving status the Loqed bridge
+    Exception thorown to indicate handling error in Loqed integration
     """
 
-    def __init__(self, session: ClientSession, ip_address: str) -> None:
-        self._session = session
-        self._ip_address = ip_address
-
-    async def get_lock_status(self) -> dict[str, str]:
-        """
-        Gets the status of the provided lock
-        """
-        result = await self._session.get(f"http://{self._ip_address}/status")
-        return await result.json(
-            content_type="text/html",
-        )
 
-
-class LoqedException(Exception):
+class LoqedAuthenticationException(LoqedException):
     """
-    Exception thorown to indicate handling error in Loqed integration
+    Exception thrown when a message could not be authenticated
     """
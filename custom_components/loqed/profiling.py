@@ -0,0 +1,140 @@
+"""On-demand profiling of the webhook, update and command paths."""
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable, Coroutine, Generator
+import cProfile
+from datetime import timedelta
+import functools
+import io
+import logging
+import pstats
+import types
+from typing import Any, TypeVar
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import COMMAND_METHODS, DOMAIN
+from .coordinator import LoqedDataCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+@types.coroutine
+def _profile_coroutine(
+    profile: cProfile.Profile, coro: Coroutine[Any, Any, _T]
+) -> Generator[Any, Any, _T]:
+    """Run a coroutine with the profiler enabled only while it executes.
+
+    Other tasks that run on the event loop while the coroutine is suspended
+    are not part of the profile.
+    """
+    value: Any = None
+    error: BaseException | None = None
+    while True:
+        profile.enable()
+        try:
+            yielded = coro.send(value) if error is None else coro.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            profile.disable()
+        try:
+            value = yield yielded
+            error = None
+        except BaseException as err:  # pylint: disable=broad-except
+            value, error = None, err
+
+
+class LoqedProfiler:
+    """Profiles the hot paths of a set of locks for a bounded time.
+
+    The profiled methods are only replaced while profiling, so the profiler
+    does not add any overhead when it is not running.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        coordinators: list[LoqedDataCoordinator],
+        path: str,
+        top: int,
+    ) -> None:
+        """Initialize the profiler."""
+        self.hass = hass
+        self.path = path
+        self._coordinators = coordinators
+        self._top = top
+        self._profile = cProfile.Profile()
+        self._unsub_timeout: CALLBACK_TYPE | None = None
+        self.stopped = False
+
+    def _wrap(
+        self, func: Callable[..., Coroutine[Any, Any, _T]]
+    ) -> Callable[..., Awaitable[_T]]:
+        """Return a version of a coroutine function that is profiled."""
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> _T:
+            return await _profile_coroutine(self._profile, func(*args, **kwargs))
+
+        return wrapper
+
+    @callback
+    def async_start(self, duration: timedelta) -> None:
+        """Start profiling and stop automatically after `duration`."""
+        for coordinator in self._coordinators:
+            coordinator.async_set_webhook_handler(
+                self._wrap(coordinator._handle_webhook)
+            )
+            setattr(
+                coordinator,
+                "_async_update_data",
+                self._wrap(coordinator._async_update_data),
+            )
+            client = coordinator.client
+            for method in COMMAND_METHODS.values():
+                setattr(client, method, self._wrap(getattr(client, method)))
+        self._unsub_timeout = async_call_later(
+            self.hass, duration, self._async_timeout
+        )
+
+    async def _async_timeout(self, _now: Any) -> None:
+        self._unsub_timeout = None
+        await self.async_stop()
+
+    async def async_stop(self) -> None:
+        """Restore the profiled methods, write the stats and log a summary."""
+        if self.stopped:
+            return
+        self.stopped = True
+        if self._unsub_timeout is not None:
+            self._unsub_timeout()
+            self._unsub_timeout = None
+
+        loaded = self.hass.data.get(DOMAIN, {}).values()
+        for coordinator in self._coordinators:
+            # Removing the instance attributes uses the methods of the class again
+            del coordinator._async_update_data
+            for method in COMMAND_METHODS.values():
+                delattr(coordinator.client, method)
+            if coordinator in loaded:
+                coordinator.async_set_webhook_handler(coordinator._handle_webhook)
+
+        summary = await self.hass.async_add_executor_job(self._write_stats)
+        _LOGGER.warning(
+            "LOQED profile written to %s, top %d functions:\n%s",
+            self.path,
+            self._top,
+            summary,
+        )
+
+    def _write_stats(self) -> str:
+        """Write the stats file and return the top functions."""
+        self._profile.dump_stats(self.path)
+        output = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=output)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self._top)
+        return output.getvalue()
@@ -1,4 +1,8 @@
 """Creates LOQED sensors."""
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from operator import attrgetter
 from typing import Final
 
 from homeassistant.components.sensor import (
@@ -12,16 +16,35 @@ from homeassistant.const import (
     PERCENTAGE,
     SIGNAL_STRENGTH_DECIBELS_MILLIWATT,
     EntityCategory,
+    UnitOfElectricPotential,
 )
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.typing import StateType
+from homeassistant.util import dt as dt_util
 
 from .const import DOMAIN
-from .coordinator import LoqedDataCoordinator, StatusMessage
+from .coordinator import LoqedDataCoordinator
 from .entity import LoqedEntity
+from .loqed import LockState
 
-SENSORS: Final[tuple[SensorEntityDescription, ...]] = (
-    SensorEntityDescription(
+
+@dataclass
+class LoqedSensorEntityDescriptionMixin:
+    """Mixin for required keys."""
+
+    value_fn: Callable[[LockState], StateType | datetime]
+
+
+@dataclass
+class LoqedSensorEntityDescription(
+    SensorEntityDescription, LoqedSensorEntityDescriptionMixin
+):
+    """Describes a LOQED sensor entity."""
+
+
+SENSORS: Final[tuple[LoqedSensorEntityDescription, ...]] = (
+    LoqedSensorEntityDescription(
         key="ble_strength",
         translation_key="ble_strength",
         device_class=SensorDeviceClass.SIGNAL_STRENGTH,
@@ -29,13 +52,50 @@ SENSORS: Final[tuple[SensorEntityDescription, ...]] = (
         state_class=SensorStateClass.MEASUREMENT,
         entity_category=EntityCategory.DIAGNOSTIC,
         entity_registry_enabled_default=False,
+        value_fn=attrgetter("ble_strength"),
     ),
-    SensorEntityDescription(
+    LoqedSensorEntityDescription(
         key="battery_percentage",
         device_class=SensorDeviceClass.BATTERY,
         state_class=SensorStateClass.MEASUREMENT,
         entity_category=EntityCategory.DIAGNOSTIC,
         native_unit_of_measurement=PERCENTAGE,
+        value_fn=attrgetter("battery_percentage"),
+    ),
+    LoqedSensorEntityDescription(
+        key="wifi_strength",
+        translation_key="wifi_strength",
+        device_class=SensorDeviceClass.SIGNAL_STRENGTH,
+        native_unit_of_measurement=SIGNAL_STRENGTH_DECIBELS_MILLIWATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=attrgetter("wifi_strength"),
+    ),
+    LoqedSensorEntityDescription(
+        key="battery_voltage",
+        device_class=SensorDeviceClass.VOLTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
+        entity_registry_enabled_default=False,
+        value_fn=attrgetter("battery_voltage"),
+    ),
+    LoqedSensorEntityDescription(
+        key="lock_online",
+        translation_key="lock_online",
+        device_class=SensorDeviceClass.ENUM,
+        options=["offline", "online"],
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda state: "online" if state.lock_online else "offline",
+    ),
+    LoqedSensorEntityDescription(
+        key="up_timestamp",
+        translation_key="up_timestamp",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda state: dt_util.utc_from_timestamp(state.up_timestamp),
     ),
 )
 
@@ -52,20 +112,19 @@ async def async_setup_entry(
 class LoqedSensor(LoqedEntity, SensorEntity):
     """Representation of Sensor state."""
 
+    entity_description: LoqedSensorEntityDescription
+
     def __init__(
-        self, coordinator: LoqedDataCoordinator, description: SensorEntityDescription
+        self,
+        coordinator: LoqedDataCoordinator,
+        description: LoqedSensorEntityDescription,
     ) -> None:
         """Initialize the sensor."""
         super().__init__(coordinator)
         self.entity_description = description
-        self._attr_unique_id = f"{self.coordinator.lock.id}_{description.key}"
-
-    @property
-    def data(self) -> StatusMessage:
-        """Return data object from DataUpdateCoordinator."""
-        return self.coordinator.lock
+        self._attr_unique_id = f"{self.coordinator.lock_id}_{description.key}"
 
     @property
-    def native_value(self) -> int:
+    def native_value(self) -> StateType | datetime:
         """Return state of sensor."""
-        return getattr(self.data, self.entity_description.key)
+        return self.entity_description.value_fn(self.coordinator.data)
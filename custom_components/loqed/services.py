@@ -0,0 +1,394 @@
+"""Services for the LOQED integration."""
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+from functools import wraps
+import logging
+from pathlib import Path
+from time import monotonic, time
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
+import voluptuous as vol
+
+from homeassistant.auth.permissions.const import POLICY_CONTROL
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import HomeAssistantError, Unauthorized, UnknownUser
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+from homeassistant.helpers.service import async_register_admin_service
+from homeassistant.util import dt as dt_util
+
+from .capture import async_replay, prepare_capture_file, read_capture
+from .const import CAPTURE_DIRECTORY, CAPTURE_SUFFIX, COMMAND_METHODS, DOMAIN
+from .coordinator import LoqedDataCoordinator
+
+if TYPE_CHECKING:
+    from .profiling import LoqedProfiler
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_QUERY_EVENTS = "query_events"
+SERVICE_GROUP_COMMAND = "group_command"
+SERVICE_START_RECORDING = "start_recording"
+SERVICE_STOP_RECORDING = "stop_recording"
+SERVICE_REPLAY_CAPTURE = "replay_capture"
+SERVICE_START_PROFILING = "start_profiling"
+SERVICE_STOP_PROFILING = "stop_profiling"
+
+ATTR_KEY_LOCAL_ID = "key_local_id"
+ATTR_EVENT_TYPE = "event_type"
+ATTR_SINCE = "since"
+ATTR_LIMIT = "limit"
+ATTR_COMMAND = "command"
+ATTR_MAX_CONCURRENCY = "max_concurrency"
+ATTR_MAX_PER_BRIDGE = "max_per_bridge"
+ATTR_RETRIES = "retries"
+ATTR_PATH = "path"
+ATTR_SPEED = "speed"
+ATTR_DURATION = "duration"
+ATTR_TOP = "top"
+
+COMMAND_TIMEOUT = 10
+
+QUERY_EVENTS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_id,
+        vol.Optional(ATTR_KEY_LOCAL_ID): vol.Coerce(int),
+        vol.Optional(ATTR_EVENT_TYPE): cv.string,
+        vol.Optional(ATTR_SINCE): cv.positive_time_period,
+        vol.Optional(ATTR_LIMIT): cv.positive_int,
+    }
+)
+
+GROUP_COMMAND_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Required(ATTR_COMMAND): vol.In(COMMAND_METHODS),
+        vol.Optional(ATTR_MAX_CONCURRENCY, default=10): cv.positive_int,
+        vol.Optional(ATTR_MAX_PER_BRIDGE, default=1): cv.positive_int,
+        vol.Optional(ATTR_RETRIES, default=1): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=5)
+        ),
+    }
+)
+
+START_RECORDING_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_id,
+        vol.Optional(ATTR_PATH): cv.string,
+    }
+)
+
+STOP_RECORDING_SCHEMA = vol.Schema({vol.Required(ATTR_ENTITY_ID): cv.entity_id})
+
+REPLAY_CAPTURE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_id,
+        vol.Required(ATTR_PATH): cv.string,
+        vol.Optional(ATTR_SPEED, default=1): vol.All(
+            vol.Coerce(float), vol.Range(min=0)
+        ),
+    }
+)
+
+START_PROFILING_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=timedelta(seconds=60)): vol.All(
+            cv.positive_time_period, vol.Range(max=timedelta(hours=1))
+        ),
+        vol.Optional(ATTR_TOP, default=20): cv.positive_int,
+    }
+)
+
+
+def _coordinator_for_entity(
+    hass: HomeAssistant, entity_id: str
+) -> LoqedDataCoordinator:
+    """Return the coordinator of the lock an entity belongs to."""
+    entry = er.async_get(hass).async_get(entity_id)
+    if (
+        entry is None
+        or entry.platform != DOMAIN
+        or (coordinator := hass.data.get(DOMAIN, {}).get(entry.config_entry_id))
+        is None
+    ):
+        raise HomeAssistantError(f"{entity_id} is not a loaded LOQED entity")
+    return coordinator
+
+
+async def async_group_command(
+    targets: dict[str, LoqedDataCoordinator],
+    command: str,
+    max_concurrency: int,
+    max_per_bridge: int,
+    retries: int,
+) -> dict[str, dict[str, Any]]:
+    """Send a command to a number of locks concurrently.
+
+    At most `max_per_bridge` commands are in flight per bridge and
+    `max_concurrency` in total. Locks for which the command failed are retried
+    up to `retries` times, the others are left alone.
+    """
+    method = COMMAND_METHODS[command]
+    total = asyncio.Semaphore(max_concurrency)
+    bridges: defaultdict[str, asyncio.Semaphore] = defaultdict(
+        lambda: asyncio.Semaphore(max_per_bridge)
+    )
+    results: dict[str, dict[str, Any]] = {
+        entity_id: {"success": False, "attempts": 0, "latency": None, "error": None}
+        for entity_id in targets
+    }
+
+    async def send(entity_id: str, coordinator: LoqedDataCoordinator) -> None:
+        result = results[entity_id]
+        async with bridges[coordinator.client.ip_address], total:
+            result["attempts"] += 1
+            start = monotonic()
+            try:
+                async with asyncio.timeout(COMMAND_TIMEOUT):
+                    await getattr(coordinator.client, method)()
+            except (asyncio.TimeoutError, aiohttp.ClientError) as err:
+                result["error"] = str(err) or type(err).__name__
+            else:
+                result["success"] = True
+                result["error"] = None
+            result["latency"] = round(monotonic() - start, 3)
+
+    pending = targets
+    for _ in range(retries + 1):
+        await asyncio.gather(
+            *(send(entity_id, coordinator) for entity_id, coordinator in pending.items())
+        )
+        pending = {
+            entity_id: coordinator
+            for entity_id, coordinator in pending.items()
+            if not results[entity_id]["success"]
+        }
+        if not pending:
+            break
+
+    return results
+
+
+def _capture_path(hass: HomeAssistant, name: str) -> str:
+    """Return the full path of a capture file.
+
+    Captures are kept in their own directory and need the capture suffix, so
+    the services can not read or append to other files.
+    """
+    if Path(name).name != name or not name.endswith(CAPTURE_SUFFIX):
+        raise HomeAssistantError(
+            f"Capture {name} must be a file name ending in {CAPTURE_SUFFIX}"
+        )
+    return hass.config.path(CAPTURE_DIRECTORY, name)
+
+
+@callback
+def _async_register_admin_service(
+    hass: HomeAssistant,
+    service: str,
+    service_func: Callable[[ServiceCall], Awaitable[ServiceResponse]],
+    schema: vol.Schema,
+) -> None:
+    """Register a service that requires admin access and can return a response.
+
+    `async_register_admin_service` does not return the response of the service.
+    """
+
+    @wraps(service_func)
+    async def admin_handler(call: ServiceCall) -> ServiceResponse:
+        if call.context.user_id:
+            user = await hass.auth.async_get_user(call.context.user_id)
+            if user is None:
+                raise UnknownUser(context=call.context)
+            if not user.is_admin:
+                raise Unauthorized(context=call.context)
+        return await service_func(call)
+
+    hass.services.async_register(
+        DOMAIN,
+        service,
+        admin_handler,
+        schema=schema,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the LOQED services."""
+    profiler: LoqedProfiler | None = None
+
+    @callback
+    def query_events(call: ServiceCall) -> ServiceResponse:
+        """Return events from the in-memory journal of a lock."""
+        coordinator = _coordinator_for_entity(hass, call.data[ATTR_ENTITY_ID])
+        since: timedelta | None = call.data.get(ATTR_SINCE)
+        events = coordinator.journal.query(
+            key_local_id=call.data.get(ATTR_KEY_LOCAL_ID),
+            event_type=call.data.get(ATTR_EVENT_TYPE),
+            since=None if since is None else (dt_util.utcnow() - since).timestamp(),
+            limit=call.data.get(ATTR_LIMIT),
+        )
+        return {
+            "events": [
+                {
+                    "time": dt_util.utc_from_timestamp(event.timestamp).isoformat(),
+                    "event_type": event.event_type,
+                    "key_local_id": event.key_local_id,
+                    "state": event.state,
+                }
+                for event in events
+            ]
+        }
+
+    async def group_command(call: ServiceCall) -> ServiceResponse:
+        """Lock, unlock or open a number of locks concurrently."""
+        # Same check as the lock services do for the entities they control
+        if call.context.user_id:
+            user = await hass.auth.async_get_user(call.context.user_id)
+            if user is None:
+                raise UnknownUser(context=call.context, permission=POLICY_CONTROL)
+            for entity_id in call.data[ATTR_ENTITY_ID]:
+                if not user.permissions.check_entity(entity_id, POLICY_CONTROL):
+                    raise Unauthorized(
+                        context=call.context,
+                        entity_id=entity_id,
+                        permission=POLICY_CONTROL,
+                    )
+
+        targets: dict[str, LoqedDataCoordinator] = {}
+        for entity_id in call.data[ATTR_ENTITY_ID]:
+            if not entity_id.startswith("lock."):
+                raise HomeAssistantError(f"{entity_id} is not a LOQED lock")
+            targets[entity_id] = _coordinator_for_entity(hass, entity_id)
+
+        results = await async_group_command(
+            targets,
+            call.data[ATTR_COMMAND],
+            call.data[ATTR_MAX_CONCURRENCY],
+            call.data[ATTR_MAX_PER_BRIDGE],
+            call.data[ATTR_RETRIES],
+        )
+        if call.return_response:
+            return {"results": results}
+        if failed := [
+            entity_id for entity_id, result in results.items() if not result["success"]
+        ]:
+            raise HomeAssistantError(
+                f"Failed to {call.data[ATTR_COMMAND]} {', '.join(failed)}"
+            )
+        return None
+
+    async def start_recording(call: ServiceCall) -> None:
+        """Start recording the traffic of a lock."""
+        entity_id = call.data[ATTR_ENTITY_ID]
+        coordinator = _coordinator_for_entity(hass, entity_id)
+        path = _capture_path(
+            hass,
+            call.data.get(
+                ATTR_PATH, f"{DOMAIN}.{coordinator.entry_id}{CAPTURE_SUFFIX}"
+            ),
+        )
+        try:
+            await hass.async_add_executor_job(prepare_capture_file, path)
+        except (OSError, ValueError) as err:
+            raise HomeAssistantError(f"Unable to record to {path}: {err}") from err
+        if coordinator.recorder is not None:
+            raise HomeAssistantError(f"{entity_id} is already recording")
+        coordinator.async_start_recording(path)
+
+    async def stop_recording(call: ServiceCall) -> ServiceResponse:
+        """Stop recording the traffic of a lock."""
+        coordinator = _coordinator_for_entity(hass, call.data[ATTR_ENTITY_ID])
+        if (recorder := await coordinator.async_stop_recording()) is None:
+            raise HomeAssistantError(f"{call.data[ATTR_ENTITY_ID]} is not recording")
+        return {"path": recorder.path, "records": recorder.records}
+
+    async def replay_capture(call: ServiceCall) -> ServiceResponse:
+        """Replay recorded traffic for a lock and report how it performed."""
+        coordinator = _coordinator_for_entity(hass, call.data[ATTR_ENTITY_ID])
+        path = _capture_path(hass, call.data[ATTR_PATH])
+        try:
+            data = await hass.async_add_executor_job(Path(path).read_bytes)
+            records = list(read_capture(data))
+        except (OSError, ValueError) as err:
+            raise HomeAssistantError(f"Unable to read capture {path}: {err}") from err
+        report = await async_replay(coordinator, records, call.data[ATTR_SPEED])
+        _LOGGER.info("Replayed %s: %s", path, report)
+        return report
+
+    @callback
+    def start_profiling(call: ServiceCall) -> None:
+        """Profile the webhook, update and command paths of all locks."""
+        nonlocal profiler
+        if profiler is not None and not profiler.stopped:
+            raise HomeAssistantError("LOQED profiler is already running")
+        # Only imported when needed, profiling is not used during normal operation
+        from .profiling import (  # pylint: disable=import-outside-toplevel
+            LoqedProfiler,
+        )
+
+        profiler = LoqedProfiler(
+            hass,
+            list(hass.data.get(DOMAIN, {}).values()),
+            hass.config.path(f"{DOMAIN}_profile.{int(time())}.cprof"),
+            call.data[ATTR_TOP],
+        )
+        profiler.async_start(call.data[ATTR_DURATION])
+
+    async def stop_profiling(call: ServiceCall) -> ServiceResponse:
+        """Stop the profiler before its duration has passed."""
+        if profiler is None or profiler.stopped:
+            raise HomeAssistantError("LOQED profiler is not running")
+        await profiler.async_stop()
+        return {"path": profiler.path}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_QUERY_EVENTS,
+        query_events,
+        schema=QUERY_EVENTS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GROUP_COMMAND,
+        group_command,
+        schema=GROUP_COMMAND_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    # Recording, replaying and profiling read and write files in the configuration
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        SERVICE_START_RECORDING,
+        start_recording,
+        schema=START_RECORDING_SCHEMA,
+    )
+    _async_register_admin_service(
+        hass, SERVICE_STOP_RECORDING, stop_recording, STOP_RECORDING_SCHEMA
+    )
+    _async_register_admin_service(
+        hass, SERVICE_REPLAY_CAPTURE, replay_capture, REPLAY_CAPTURE_SCHEMA
+    )
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        SERVICE_START_PROFILING,
+        start_profiling,
+        schema=START_PROFILING_SCHEMA,
+    )
+    _async_register_admin_service(
+        hass, SERVICE_STOP_PROFILING, stop_profiling, vol.Schema({})
+    )
@@ -0,0 +1,80 @@
+"""Benchmark the time it takes to import the loqed integration.
+
+Runs a fresh interpreter a number of times with `-X importtime`, preloads the
+modules Home Assistant has already imported when it sets up the integration
+and reads the cumulative import time of `custom_components.loqed`. Exits with
+a non-zero status when the median goes past the budget.
+
+    python script/bench_import.py --budget-ms 50
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+
+ROOT = Path(__file__).resolve().parent.parent
+MODULE = "custom_components.loqed"
+
+# Modules that are loaded by Home Assistant before the integration is set up:
+# the core helpers and the integrations listed in `dependencies` of the manifest.
+PRELOAD = (
+    "homeassistant.components.persistent_notification",
+    "homeassistant.components.webhook",
+    "homeassistant.helpers.config_validation",
+    "homeassistant.helpers.entity_platform",
+    "homeassistant.helpers.entity_registry",
+    "homeassistant.helpers.event",
+    "homeassistant.helpers.storage",
+    "homeassistant.helpers.update_coordinator",
+)
+
+
+def measure_once(module: str) -> float:
+    """Return the cumulative import time of a module in milliseconds."""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"import {', '.join(PRELOAD)}; import {module}",
+        ],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        _, cumulative, name = line.rsplit("|", 2)
+        if name.strip() == module:
+            return int(cumulative) / 1000
+    raise RuntimeError(f"{module} was not imported")
+
+
+def main() -> int:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=50)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--module", default=MODULE)
+    args = parser.parse_args()
+
+    timings = [measure_once(args.module) for _ in range(args.runs)]
+    median = statistics.median(timings)
+    print(
+        f"{args.module}: median {median:.1f} ms, min {min(timings):.1f} ms, "
+        f"max {max(timings):.1f} ms over {args.runs} runs "
+        f"(budget {args.budget_ms:.1f} ms)"
+    )
+    if median > args.budget_ms:
+        print(f"Import time is over budget by {median - args.budget_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Benchmark the memory used per lock by the loqed integration.
+
+Sets up a fleet of simulated bridges, see `fleet.py`, and uses tracemalloc to
+measure the memory that is still allocated after the config entries of the
+locks are set up. One lock is set up before measuring, so the one-time cost of
+importing the integration and setting up its platforms is left out. Every
+fleet size runs in a fresh interpreter.
+
+    python script/bench_memory.py --locks 1,100,500 --top 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+from pathlib import Path
+import subprocess
+import sys
+import tracemalloc
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fleet import Fleet  # noqa: E402
+
+
+async def measure(locks: int, top: int) -> dict[str, Any]:
+    """Return the memory allocated per lock for a fleet of locks."""
+    fleet = Fleet()
+    await fleet.async_start()
+    await fleet.async_add_locks(1)
+
+    gc.collect()
+    tracemalloc.start(1)
+    before = tracemalloc.take_snapshot()
+    await fleet.async_add_locks(locks)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    await fleet.async_stop()
+
+    stats = after.compare_to(before, "filename")
+    return {
+        "locks": locks,
+        "bytes_per_lock": round(sum(stat.size_diff for stat in stats) / locks),
+        "top": [
+            (stat.traceback[0].filename, round(stat.size_diff / locks))
+            for stat in stats[:top]
+        ],
+    }
+
+
+def main() -> int:
+    """Run the benchmark for every fleet size."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locks", default="1,100,500", help="comma separated")
+    parser.add_argument(
+        "--top", type=int, default=0, help="show the files allocating the most"
+    )
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(asyncio.run(measure(args.single, args.top))))
+        return 0
+
+    for locks in (int(value) for value in args.locks.split(",")):
+        output = subprocess.run(
+            [sys.executable, __file__, "--single", str(locks), "--top", str(args.top)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{locks} locks: {result['bytes_per_lock']} bytes per lock")
+        for filename, size in result["top"]:
+            print(f"  {size:>8} {filename}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
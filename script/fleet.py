@@ -0,0 +1,279 @@
+"""In-process fleet of fake LOQED bridges backing a real Home Assistant instance.
+
+Used by the load test and the memory benchmark. Every bridge gets its own
+config entry, which is set up by the real integration. Requests from the
+integration are answered in-process instead of over the network, and webhooks
+are delivered through the webhook integration the way Home Assistant receives
+them from a bridge.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+from collections.abc import Callable
+from hashlib import sha256
+import json
+from pathlib import Path
+import sys
+import tempfile
+from time import time
+from typing import Any
+from urllib.parse import unquote, urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+INTERNAL_URL = "http://127.0.0.1:8123"
+
+# Action byte at the end of a signed command, see ActionType
+ACTION_STATES = {1: "open", 2: "latch", 3: "night_lock"}
+
+
+class FakeResponse:
+    """Response returned by the fake session."""
+
+    def __init__(self, status: int, body: bytes) -> None:
+        """Initialize the response."""
+        self.status = status
+        self._body = body
+
+    async def __aenter__(self) -> FakeResponse:
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        return None
+
+    async def read(self) -> bytes:
+        """Return the body."""
+        return self._body
+
+    def raise_for_status(self) -> None:
+        """Raise when the bridge returned an error."""
+        if self.status >= 400:
+            from aiohttp import ClientError  # pylint: disable=import-outside-toplevel
+
+            raise ClientError(f"Bridge returned {self.status}")
+
+
+class FakeBridge:
+    """A LOQED bridge and the lock paired with it."""
+
+    def __init__(self, index: int, latency: float = 0) -> None:
+        """Initialize the bridge."""
+        self.index = index
+        self.host = f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}"
+        self.mac = ":".join(
+            f"{byte:02x}" for byte in (0xAA, 0xBB, 0xCC, *index.to_bytes(3, "big"))
+        )
+        self.key = base64.b64encode(index.to_bytes(32, "big")).decode()
+        self.latency = latency
+        self.bolt_state = "night_lock"
+        self.webhooks: list[dict[str, Any]] = []
+        self.commands = 0
+        self.on_command: Callable[[FakeBridge, str], None] | None = None
+        self._bridge_key = base64.b64decode(self.key)
+
+    @property
+    def entry_data(self) -> dict[str, Any]:
+        """Return the data of the config entry of this bridge."""
+        return {
+            "bridge_ip": self.host,
+            "bridge_key": self.key,
+            "lock_key_key": self.key,
+            "lock_key_local_id": 1,
+            "bridge_mdns_hostname": f"LOQED-{self.mac.replace(':', '')}.local",
+            "name": f"Lock {self.index}",
+            "id": self.index,
+            "webhook_id": f"loqed_fleet_{self.index}",
+            "api_token": "fleet",
+        }
+
+    def status(self) -> dict[str, Any]:
+        """Return the body of the status endpoint."""
+        return {
+            "battery_percentage": 80,
+            "battery_type": "nimh",
+            "battery_type_numeric": 1,
+            "battery_voltage": 1.3,
+            "bolt_state": self.bolt_state,
+            "bolt_state_numeric": 3,
+            "bridge_mac_wifi": self.mac,
+            "bridge_mac_ble": self.mac,
+            "lock_online": 1,
+            "webhooks_number": len(self.webhooks),
+            "ip_address": self.host,
+            "up_timestamp": 1700000000,
+            "wifi_strength": -50,
+            "ble_strength": -70,
+        }
+
+    async def handle(
+        self, method: str, path: str, json_body: Any = None
+    ) -> FakeResponse:
+        """Answer a request from the integration."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if path == "/status":
+            return FakeResponse(200, json.dumps(self.status()).encode())
+        if path == "/webhooks" and method == "GET":
+            return FakeResponse(200, json.dumps(self.webhooks).encode())
+        if path == "/webhooks" and method == "POST":
+            self.webhooks.append(
+                {"id": len(self.webhooks) + 1, "url": json_body["url"]}
+            )
+            return FakeResponse(200, b"")
+        if path.startswith("/webhooks/") and method == "DELETE":
+            webhook_id = int(path.rsplit("/", 1)[1])
+            self.webhooks = [x for x in self.webhooks if x["id"] != webhook_id]
+            return FakeResponse(200, b"")
+        if path.startswith("/to_lock?"):
+            self.commands += 1
+            command = base64.b64decode(unquote(path.split("=", 1)[1]))
+            if self.on_command is not None:
+                self.on_command(self, ACTION_STATES[command[-1]])
+            return FakeResponse(200, b"")
+        return FakeResponse(404, b"")
+
+    def signed_state_reached(
+        self, state: str, key_local_id: int = 1
+    ) -> tuple[bytes, dict[str, str]]:
+        """Return a signed state reached message and its headers."""
+        body = json.dumps(
+            {
+                "requested_state": state.upper(),
+                "requested_state_numeric": 0,
+                "event_type": f"STATE_CHANGED_{state.upper()}",
+                "key_local_id": key_local_id,
+                "mac_wifi": self.mac,
+                "mac_ble": self.mac,
+            }
+        ).encode()
+        timestamp = int(time())
+        signature = sha256(
+            body + timestamp.to_bytes(8, "big") + self._bridge_key
+        ).hexdigest()
+        return body, {"TIMESTAMP": str(timestamp), "HASH": signature}
+
+    @property
+    def webhook_id(self) -> str:
+        """Return the id of the webhook registered on this bridge."""
+        return urlsplit(self.webhooks[-1]["url"]).path.rsplit("/", 1)[1]
+
+
+class FakeSession:
+    """Client session routing requests to the fake bridges."""
+
+    def __init__(self, bridges: dict[str, FakeBridge]) -> None:
+        """Initialize the session."""
+        self.bridges = bridges
+
+    def request(self, method: str, url: str, **kwargs: Any) -> _PendingResponse:
+        """Send a request to a fake bridge."""
+        parts = urlsplit(url)
+        path = f"{parts.path}?{parts.query}" if parts.query else parts.path
+        bridge = self.bridges[parts.hostname]
+        return _PendingResponse(bridge.handle(method, path, kwargs.get("json")))
+
+
+class _PendingResponse:
+    """Awaitable context manager like the one returned by aiohttp."""
+
+    def __init__(self, coro: Any) -> None:
+        self._coro = coro
+
+    async def __aenter__(self) -> FakeResponse:
+        return await self._coro
+
+    async def __aexit__(self, *args: Any) -> None:
+        return None
+
+
+class Fleet:
+    """A Home Assistant instance with a number of fake LOQED bridges."""
+
+    def __init__(self, bridge_latency: float = 0) -> None:
+        """Initialize the fleet."""
+        self.bridge_latency = bridge_latency
+        self.bridges: dict[str, FakeBridge] = {}
+        self.hass: Any = None
+        self._config_dir = tempfile.TemporaryDirectory(prefix="loqed_fleet_")
+
+    async def async_start(self) -> None:
+        """Start Home Assistant with the integration available."""
+        config_dir = Path(self._config_dir.name)
+        (config_dir / "custom_components").symlink_to(ROOT / "custom_components")
+        sys.path.insert(0, str(config_dir))
+
+        # pylint: disable=import-outside-toplevel
+        import homeassistant.components.persistent_notification  # noqa: F401
+        from homeassistant import config_entries, loader
+        from homeassistant.core import CoreState, HomeAssistant
+        from homeassistant.helpers import (
+            area_registry as ar,
+            device_registry as dr,
+            entity,
+            entity_registry as er,
+        )
+
+        from custom_components.loqed import coordinator
+
+        # Requests of the integration are answered by the fake bridges
+        session = FakeSession(self.bridges)
+        coordinator.async_get_clientsession = lambda hass: session
+
+        hass = self.hass = HomeAssistant(str(config_dir))
+        hass.config.internal_url = INTERNAL_URL
+        hass.config.skip_pip = True
+        loader.async_setup(hass)
+        entity.async_setup(hass)
+        await ar.async_load(hass)
+        await dr.async_load(hass)
+        await er.async_load(hass)
+        hass.config_entries = config_entries.ConfigEntries(hass, {})
+        await hass.config_entries.async_initialize()
+        # The webhook integration is called directly, its HTTP view is not needed
+        hass.config.components.update({"http", "webhook"})
+        hass.state = CoreState.running
+
+    async def async_add_locks(self, count: int) -> list[FakeBridge]:
+        """Add bridges and set up a config entry for each of them."""
+        # pylint: disable=import-outside-toplevel
+        from homeassistant import config_entries
+
+        added = []
+        for index in range(len(self.bridges), len(self.bridges) + count):
+            bridge = FakeBridge(index, self.bridge_latency)
+            self.bridges[bridge.host] = bridge
+            entry = config_entries.ConfigEntry(
+                version=1,
+                domain="loqed",
+                title=f"Lock {index}",
+                data=bridge.entry_data,
+                source=config_entries.SOURCE_USER,
+                unique_id=bridge.mac,
+            )
+            await self.hass.config_entries.async_add(entry)
+            added.append(bridge)
+        await self.hass.async_block_till_done()
+        return added
+
+    async def async_send_webhook(
+        self, bridge: FakeBridge, state: str, key_local_id: int = 1
+    ) -> None:
+        """Deliver a signed state reached message from a bridge."""
+        # pylint: disable=import-outside-toplevel
+        from homeassistant.components import webhook
+        from homeassistant.util.aiohttp import MockRequest
+
+        body, headers = bridge.signed_state_reached(state, key_local_id)
+        bridge.bolt_state = state
+        await webhook.async_handle_webhook(
+            self.hass,
+            bridge.webhook_id,
+            MockRequest(
+                content=body, mock_source=bridge.host, method="POST", headers=headers
+            ),
+        )
+
+    async def async_stop(self) -> None:
+        """Stop Home Assistant and remove its configuration."""
+        await self.hass.async_stop(force=True)
+        self._config_dir.cleanup()
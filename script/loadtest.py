@@ -0,0 +1,301 @@
+"""Load test the loqed integration with a fleet of simulated locks.
+
+Sets up one config entry per fake bridge in a single Home Assistant instance
+and drives signed webhooks and lock commands through the real webhook
+handlers, coordinators and entities at a fixed rate per lock. Every fleet size
+runs in a fresh interpreter and the results form a scaling curve:
+
+    python script/loadtest.py --locks 1,50,100,250,500 --duration 30 --csv out.csv
+
+Reported per fleet size:
+
+- event loop lag: how late a 5 ms timer on the event loop fires (p99 and max)
+- webhook latency: from handing a webhook to Home Assistant until the state of
+  the lock entity changed (p50 and p99). Every webhook carries its own key id,
+  which the lock reports as `changed_by`, to match state changes to webhooks.
+  Webhooks that never led to a state change are counted as unmatched.
+- command latency: duration of the lock.lock/lock.unlock service call (p99)
+- CPU time per webhook or command, including the CPU time used while idle and
+  with the idle CPU usage over the same time subtracted, and the CPU usage of
+  the same instance while idle
+- memory allocated per lock while the config entries are set up, including
+  the one-time setup of the lock and sensor platforms
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import gc
+import itertools
+import json
+import math
+from pathlib import Path
+import random
+import subprocess
+import sys
+from time import monotonic, process_time
+import tracemalloc
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fleet import FakeBridge, Fleet  # noqa: E402
+
+LOOP_LAG_INTERVAL = 0.005
+IDLE_PERIOD = 2
+# Key ids are stored as signed 16 bit integers by the event journal
+MAX_KEY_ID = 2**15 - 1
+COLUMNS = (
+    "locks",
+    "webhooks",
+    "commands",
+    "events_per_second",
+    "loop_lag_p99_ms",
+    "loop_lag_max_ms",
+    "webhook_latency_p50_ms",
+    "webhook_latency_p99_ms",
+    "unmatched_webhooks",
+    "command_latency_p99_ms",
+    "cpu_us_per_event",
+    "cpu_us_per_event_net",
+    "idle_cpu_percent",
+    "memory_kib_per_lock",
+)
+
+
+def percentile(values: list[float], percentile: float) -> float | None:
+    """Return a percentile of the values using the nearest rank."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(len(values) * percentile / 100) - 1)]
+
+
+def ms(value: float | None) -> float | None:
+    """Convert seconds to rounded milliseconds."""
+    return None if value is None else round(value * 1000, 3)
+
+
+async def monitor_loop_lag(lags: list[float]) -> None:
+    """Measure how late a short timer fires on the event loop."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lags.append(loop.time() - start - LOOP_LAG_INTERVAL)
+
+
+async def run_fleet(
+    locks: int,
+    duration: float,
+    webhook_rate: float,
+    command_rate: float,
+    bridge_latency: float,
+) -> dict[str, Any]:
+    """Set up a fleet, put it under load and return the measurements."""
+    # pylint: disable=import-outside-toplevel
+    from homeassistant.const import EVENT_STATE_CHANGED
+    from homeassistant.core import Event, callback
+    from homeassistant.helpers import entity_registry as er
+
+    fleet = Fleet(bridge_latency)
+    await fleet.async_start()
+    hass = fleet.hass
+    # Import the integration up front so memory per lock leaves out its modules
+    from custom_components.loqed import lock, sensor  # noqa: F401
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    bridges = await fleet.async_add_locks(locks)
+    gc.collect()
+    memory_per_lock = (tracemalloc.get_traced_memory()[0] - before) / locks
+    tracemalloc.stop()
+
+    registry = er.async_get(hass)
+    lock_entities = {
+        registry.async_get_entity_id("lock", "loqed", bridge.mac): bridge
+        for bridge in bridges
+    }
+    sent: dict[tuple[str, str], float] = {}
+    key_ids = itertools.cycle(range(1, MAX_KEY_ID + 1))
+    webhook_latencies: list[float] = []
+    command_latencies: list[float] = []
+    lags: list[float] = []
+
+    @callback
+    def state_changed(event: Event) -> None:
+        if (new_state := event.data["new_state"]) is None:
+            return
+        changed_by = new_state.attributes.get("changed_by")
+        if (start := sent.pop((event.data["entity_id"], changed_by), None)) is not None:
+            webhook_latencies.append(monotonic() - start)
+
+    async def deliver(entity_id: str, bridge: FakeBridge, state: str) -> None:
+        key_id = next(key_ids)
+        sent[entity_id, f"KeyID {key_id}"] = monotonic()
+        await fleet.async_send_webhook(bridge, state, key_id)
+
+    def bridge_command(bridge: FakeBridge, state: str) -> None:
+        # The bridge reports the new state once the lock reached it
+        hass.async_create_task(deliver(bridge_entities[bridge.host], bridge, state))
+
+    bridge_entities = {
+        bridge.host: entity_id for entity_id, bridge in lock_entities.items()
+    }
+    for bridge in bridges:
+        bridge.on_command = bridge_command
+
+    async def send_webhook(entity_id: str, bridge: FakeBridge) -> None:
+        state = "latch" if bridge.bolt_state == "night_lock" else "night_lock"
+        await deliver(entity_id, bridge, state)
+
+    async def send_command(entity_id: str, bridge: FakeBridge) -> None:
+        service = "unlock" if bridge.bolt_state == "night_lock" else "lock"
+        start = monotonic()
+        await hass.services.async_call(
+            "lock", service, {"entity_id": entity_id}, blocking=True
+        )
+        command_latencies.append(monotonic() - start)
+
+    unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, state_changed)
+    monitor = asyncio.create_task(monitor_loop_lag(lags))
+
+    # CPU time used by the monitor and an idle Home Assistant, which is part of
+    # the CPU time per event
+    cpu_start = process_time()
+    await asyncio.sleep(IDLE_PERIOD)
+    idle_cpu = (process_time() - cpu_start) / IDLE_PERIOD
+    lags.clear()
+
+    # Open loop load: events are started on schedule, regardless of how long
+    # earlier events take to complete
+    targets = list(lock_entities.items())
+    total_rate = (webhook_rate + command_rate) * locks
+    events = int(total_rate * duration)
+    webhooks = commands = 0
+    tasks = []
+    cpu_start = process_time()
+    start = monotonic()
+    for index in range(events):
+        if (delay := start + index / total_rate - monotonic()) > 0:
+            await asyncio.sleep(delay)
+        entity_id, bridge = random.choice(targets)
+        if random.random() * (webhook_rate + command_rate) < webhook_rate:
+            webhooks += 1
+            tasks.append(asyncio.create_task(send_webhook(entity_id, bridge)))
+        else:
+            commands += 1
+            tasks.append(asyncio.create_task(send_command(entity_id, bridge)))
+    await asyncio.gather(*tasks)
+    await hass.async_block_till_done()
+    elapsed = monotonic() - start
+    cpu = process_time() - cpu_start
+
+    monitor.cancel()
+    unsub()
+    await fleet.async_stop()
+
+    return {
+        "locks": locks,
+        "webhooks": webhooks,
+        "commands": commands,
+        "events_per_second": round(events / elapsed, 1),
+        "loop_lag_p99_ms": ms(percentile(lags, 99)),
+        "loop_lag_max_ms": ms(max(lags, default=None)),
+        "webhook_latency_p50_ms": ms(percentile(webhook_latencies, 50)),
+        "webhook_latency_p99_ms": ms(percentile(webhook_latencies, 99)),
+        "unmatched_webhooks": len(sent),
+        "command_latency_p99_ms": ms(percentile(command_latencies, 99)),
+        "cpu_us_per_event": round(cpu / events * 1_000_000, 1),
+        "cpu_us_per_event_net": round(
+            (cpu - idle_cpu * elapsed) / events * 1_000_000, 1
+        ),
+        "idle_cpu_percent": round(idle_cpu * 100, 1),
+        "memory_kib_per_lock": round(memory_per_lock / 1024, 1),
+    }
+
+
+def main() -> int:
+    """Run the load test for every fleet size."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--locks", default="1,50,100,250,500", help="comma separated fleet sizes"
+    )
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument(
+        "--webhook-rate", type=float, default=0.2, help="webhooks per lock per second"
+    )
+    parser.add_argument(
+        "--command-rate", type=float, default=0.02, help="commands per lock per second"
+    )
+    parser.add_argument(
+        "--bridge-latency", type=float, default=0.0, help="seconds per bridge request"
+    )
+    parser.add_argument("--csv", type=Path, help="write the scaling curve to a file")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        sizes = [args.single]
+    else:
+        sizes = [int(value) for value in args.locks.split(",")]
+    for locks in sizes:
+        if int((args.webhook_rate + args.command_rate) * locks * args.duration) < 1:
+            parser.error(
+                f"No events are sent to {locks} locks in {args.duration} seconds,"
+                " increase the duration or the rates"
+            )
+
+    if args.single:
+        result = asyncio.run(
+            run_fleet(
+                args.single,
+                args.duration,
+                args.webhook_rate,
+                args.command_rate,
+                args.bridge_latency,
+            )
+        )
+        print(json.dumps(result))
+        return 0
+
+    results = []
+    print(" | ".join(COLUMNS))
+    for locks in sizes:
+        # Every fleet size runs in a fresh interpreter so runs do not affect
+        # each other's memory and caches
+        output = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--single",
+                str(locks),
+                "--duration",
+                str(args.duration),
+                "--webhook-rate",
+                str(args.webhook_rate),
+                "--command-rate",
+                str(args.command_rate),
+                "--bridge-latency",
+                str(args.bridge_latency),
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results.append(result)
+        print(" | ".join(str(result[column]) for column in COLUMNS))
+
+    if args.csv:
+        with args.csv.open("w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerows(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
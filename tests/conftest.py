@@ -0,0 +1,4 @@
+"""Fixtures for the LOQED tests."""
+# Home Assistant imports persistent_notification before any integration, the
+# webhook integration imported by the loqed package cannot be imported first
+import homeassistant.components.persistent_notification  # noqa: F401
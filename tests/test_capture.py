@@ -0,0 +1,136 @@
+"""Tests for recording and reading LOQED captures."""
+import asyncio
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from homeassistant import config_entries
+from homeassistant.core import HomeAssistant
+
+from custom_components.loqed.capture import (
+    KIND_STATUS,
+    KIND_WEBHOOK,
+    CaptureRecord,
+    CaptureRecorder,
+    async_replay,
+    prepare_capture_file,
+    read_capture,
+)
+from custom_components.loqed.const import DOMAIN
+from custom_components.loqed.coordinator import LoqedDataCoordinator
+
+from .test_loqed import BRIDGE_KEY, LOCK_KEY, NOW, _lock_state, _sign
+
+
+def _write_capture(path: Path) -> None:
+    hass: Any = None
+    recorder = CaptureRecorder(hass, str(path))
+    recorder.record_webhook("1700000000", "abc123", b'{"event_type": "BATTERY"}')
+    recorder._write(bytes(recorder._buffer))
+    recorder._buffer.clear()
+    recorder.record_status(b'{"bolt_state": "night_lock"}')
+    recorder._write(bytes(recorder._buffer))
+
+
+def test_round_trip(tmp_path: Path) -> None:
+    """Records written in several flushes are read back in order."""
+    path = tmp_path / "loqed.capture"
+    _write_capture(path)
+
+    webhook, status = read_capture(path.read_bytes())
+
+    assert (webhook.kind, webhook.timestamp, webhook.hash, webhook.body) == (
+        KIND_WEBHOOK,
+        "1700000000",
+        "abc123",
+        b'{"event_type": "BATTERY"}',
+    )
+    assert (status.kind, status.timestamp, status.hash, status.body) == (
+        KIND_STATUS,
+        "",
+        "",
+        b'{"bolt_state": "night_lock"}',
+    )
+    assert webhook.arrival <= status.arrival
+
+
+def test_not_a_capture() -> None:
+    """Files without the capture header are rejected."""
+    with pytest.raises(ValueError, match="Not a LOQED capture file"):
+        list(read_capture(b"something else"))
+
+
+@pytest.mark.parametrize("cut", [1, 20, 33])
+def test_truncated(tmp_path: Path, cut: int) -> None:
+    """A capture cut off in a header or body is rejected."""
+    path = tmp_path / "loqed.capture"
+    _write_capture(path)
+
+    with pytest.raises(ValueError, match="Truncated capture"):
+        list(read_capture(path.read_bytes()[:-cut]))
+
+
+def test_refuses_other_files(tmp_path: Path) -> None:
+    """Files that are not captures are never appended to."""
+    path = tmp_path / "secrets.capture"
+    path.write_text("api_password: hunter2\n")
+    hass: Any = None
+    recorder = CaptureRecorder(hass, str(path))
+
+    with pytest.raises(ValueError, match="is not a LOQED capture file"):
+        prepare_capture_file(str(path))
+    with pytest.raises(ValueError, match="is not a LOQED capture file"):
+        recorder._write(b"record")
+    assert path.read_text() == "api_password: hunter2\n"
+
+
+def test_prepare_capture_file(tmp_path: Path) -> None:
+    """The capture directory is created and captures can be appended to."""
+    path = tmp_path / "loqed_captures" / "loqed.capture"
+
+    prepare_capture_file(str(path))
+    assert path.parent.is_dir()
+
+    _write_capture(path)
+    prepare_capture_file(str(path))
+
+
+def test_replay_reports_rejected_webhooks(tmp_path: Path) -> None:
+    """Webhooks with a wrong signature or unknown content are rejected."""
+    accepted = json.dumps({"event_type": "STATE_CHANGED_OPEN"}).encode()
+    unknown = json.dumps({"something": "else"}).encode()
+    records = [
+        CaptureRecord(KIND_WEBHOOK, NOW, str(NOW), _sign(accepted, NOW), accepted),
+        CaptureRecord(KIND_WEBHOOK, NOW, str(NOW), _sign(b"other", NOW), accepted),
+        CaptureRecord(KIND_WEBHOOK, NOW, str(NOW), _sign(unknown, NOW), unknown),
+    ]
+
+    async def run() -> dict[str, Any]:
+        hass = HomeAssistant(str(tmp_path))
+        entry = config_entries.ConfigEntry(
+            version=1,
+            domain=DOMAIN,
+            title="Lock",
+            data={
+                "bridge_ip": "192.168.1.2",
+                "bridge_key": BRIDGE_KEY,
+                "lock_key_key": LOCK_KEY,
+                "lock_key_local_id": 5,
+                "name": "Lock",
+                "webhook_id": "webhook",
+            },
+            source="user",
+        )
+        coordinator = LoqedDataCoordinator(hass, entry)
+        coordinator.data = _lock_state("night_lock")
+        report = await async_replay(coordinator, records, 0)
+        assert len(coordinator.journal) == 0
+        await hass.async_stop(force=True)
+        return report
+
+    report = asyncio.run(run())
+
+    assert report["webhooks"] == 3
+    assert report["rejected_webhooks"] == 2
@@ -0,0 +1,97 @@
+"""Tests for the LOQED event journal."""
+import random
+
+from custom_components.loqed.journal import JournalEvent, LoqedEventJournal
+
+
+def test_query_returns_newest_first() -> None:
+    """Events are returned newest first."""
+    journal = LoqedEventJournal(8)
+    journal.append("STATE_CHANGED_OPEN", 1, "OPEN", 1.0)
+    journal.append("STATE_CHANGED_NIGHT_LOCK", 2, "NIGHT_LOCK", 2.0)
+
+    assert journal.query() == [
+        JournalEvent(2.0, "STATE_CHANGED_NIGHT_LOCK", 2, "NIGHT_LOCK"),
+        JournalEvent(1.0, "STATE_CHANGED_OPEN", 1, "OPEN"),
+    ]
+    assert len(journal) == 2
+    assert journal.revision == 2
+
+
+def test_oldest_events_are_overwritten() -> None:
+    """A full journal drops its oldest events, also from the indexes."""
+    journal = LoqedEventJournal(3)
+    for index in range(5):
+        journal.append("EVENT", index, None, float(index))
+
+    assert len(journal) == 3
+    assert [event.key_local_id for event in journal.query()] == [4, 3, 2]
+    assert journal.query(key_local_id=1) == []
+    assert [event.timestamp for event in journal.query(event_type="EVENT")] == [
+        4.0,
+        3.0,
+        2.0,
+    ]
+
+
+def test_events_without_key() -> None:
+    """Battery events have no key and are not in the key index."""
+    journal = LoqedEventJournal(4)
+    journal.append("BATTERY", timestamp=1.0)
+
+    assert journal.query() == [JournalEvent(1.0, "BATTERY", None, None)]
+    assert journal.query(key_local_id=-1) == []
+
+
+def test_unknown_filters() -> None:
+    """Filtering on a key or event type that was never seen returns nothing."""
+    journal = LoqedEventJournal(4)
+    journal.append("EVENT", 1, None, 1.0)
+
+    assert journal.query(key_local_id=2) == []
+    assert journal.query(event_type="OTHER") == []
+
+
+def test_restore_round_trip() -> None:
+    """A snapshot restores the same events."""
+    journal = LoqedEventJournal(4)
+    for index in range(6):
+        journal.append(f"EVENT_{index % 2}", index % 3, "STATE", float(index))
+
+    restored = LoqedEventJournal(4)
+    restored.restore(journal.as_dict())
+
+    assert restored.query() == journal.query()
+
+
+def test_matches_brute_force_model() -> None:
+    """Queries return the same events as filtering a plain list."""
+    rng = random.Random(1234)
+    capacity = 16
+    journal = LoqedEventJournal(capacity)
+    events: list[JournalEvent] = []
+
+    for index in range(200):
+        event = JournalEvent(
+            float(index),
+            rng.choice(("BATTERY", "STATE_CHANGED_OPEN", "GO_TO_STATE_LATCH")),
+            rng.choice((None, 1, 2, 3)),
+            rng.choice((None, "OPEN", "LATCH")),
+        )
+        journal.append(event.event_type, event.key_local_id, event.state, index)
+        events.append(event)
+        held = events[-capacity:][::-1]
+
+        key_local_id = rng.choice((None, 1, 2, 3))
+        event_type = rng.choice((None, "BATTERY", "GO_TO_STATE_LATCH"))
+        since = rng.choice((None, float(index - 5)))
+        limit = rng.choice((None, 1, 3))
+        expected = [
+            event
+            for event in held
+            if (key_local_id is None or event.key_local_id == key_local_id)
+            and (event_type is None or event.event_type == event_type)
+            and (since is None or event.timestamp >= since)
+        ][:limit]
+
+        assert journal.query(key_local_id, event_type, since, limit) == expected
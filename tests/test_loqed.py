@@ -0,0 +1,192 @@
+"""Tests for the LOQED bridge client."""
+import base64
+import hashlib
+import hmac
+import json
+import struct
+from typing import Any
+from urllib.parse import unquote
+
+import pytest
+
+from custom_components.loqed.loqed import (
+    ActionType,
+    BoltState,
+    LockState,
+    LoqedAuthenticationException,
+    LoqedBridgeClient,
+    LoqedException,
+    StatusMessage,
+)
+
+BRIDGE_KEY = base64.b64encode(b"bridge-key-0123456789abcdef").decode()
+LOCK_KEY = base64.b64encode(b"lock-key-0123456789abcdef").decode()
+NOW = 1_700_000_000
+
+
+def _client() -> LoqedBridgeClient:
+    session: Any = None
+    return LoqedBridgeClient(
+        session, "192.168.1.2", BRIDGE_KEY, LOCK_KEY, 5, clock=lambda: NOW
+    )
+
+
+def _sign(body: bytes, timestamp: int) -> str:
+    return hashlib.sha256(
+        body + timestamp.to_bytes(8, "big") + base64.b64decode(BRIDGE_KEY)
+    ).hexdigest()
+
+
+def test_generate_signature() -> None:
+    """The signature hashes the body, the timestamp and the bridge key."""
+    assert _client().generate_signature(b"body", NOW) == _sign(b"body", NOW)
+
+
+def test_validate_message_checks_drift() -> None:
+    """Signed messages are only valid close to the current time."""
+    client = _client()
+    assert client.validate_message(b"body", NOW - 59, _sign(b"body", NOW - 59))
+    assert not client.validate_message(b"body", NOW - 61, _sign(b"body", NOW - 61))
+    assert client.validate_message(
+        b"body", NOW - 61, _sign(b"body", NOW - 61), allow_all_times=True
+    )
+    assert not client.validate_message(b"other", NOW, _sign(b"body", NOW))
+
+
+def test_parse_webhook() -> None:
+    """A signed JSON object is decoded."""
+    body = json.dumps({"event_type": "STATE_CHANGED_OPEN"}).encode()
+    assert _client().parse_webhook(body, str(NOW), _sign(body, NOW)) == {
+        "event_type": "STATE_CHANGED_OPEN"
+    }
+
+
+@pytest.mark.parametrize("timestamp", [str(NOW), "not a number"])
+def test_parse_webhook_rejects_invalid_signature(timestamp: str) -> None:
+    """Messages with a wrong signature or timestamp are rejected."""
+    with pytest.raises(LoqedAuthenticationException):
+        _client().parse_webhook(b"{}", timestamp, _sign(b"other", NOW))
+
+
+@pytest.mark.parametrize("body", [b"not json", b"[1, 2]", b"null"])
+def test_parse_webhook_rejects_invalid_body(body: bytes) -> None:
+    """Signed bodies that are not a JSON object are rejected."""
+    with pytest.raises(LoqedException):
+        _client().parse_webhook(body, str(NOW), _sign(body, NOW))
+
+
+@pytest.mark.parametrize("action", list(ActionType))
+def test_command_encoding(action: ActionType) -> None:
+    """Commands carry the time, key id and action, signed with the lock key."""
+    command = base64.b64decode(unquote(_client()._get_command(action)))
+
+    message_id, protocol, command_type = struct.unpack_from("QBB", command)
+    timestamp = int.from_bytes(command[10:18], "big")
+    signature = command[18:50]
+    local_key_id, device_id, action_value = command[50:]
+
+    assert (message_id, protocol, command_type) == (0, 2, 7)
+    assert timestamp == NOW
+    assert (local_key_id, device_id, action_value) == (5, 1, action.value)
+    assert signature == hmac.new(
+        base64.b64decode(LOCK_KEY),
+        bytes([2, 7]) + NOW.to_bytes(8, "big") + bytes([5, 1, action.value]),
+        hashlib.sha256,
+    ).digest()
+
+
+def _lock_state(bolt_state: str) -> LockState:
+    status = {
+        "battery_percentage": 80,
+        "battery_type": "nimh",
+        "battery_type_numeric": 1,
+        "battery_voltage": 1.3,
+        "bolt_state": bolt_state,
+        "bolt_state_numeric": 3,
+        "bridge_mac_wifi": "aa:bb:cc:dd:ee:ff",
+        "bridge_mac_ble": "aa:bb:cc:dd:ee:ff",
+        "lock_online": 1,
+        "webhooks_number": 1,
+        "ip_address": "192.168.1.2",
+        "up_timestamp": NOW,
+        "wifi_strength": -50,
+        "ble_strength": -70,
+    }
+    return LockState(StatusMessage.from_json(json.dumps(status).encode()))
+
+
+@pytest.mark.parametrize(
+    ("bolt_state", "event_type", "expected"),
+    [
+        ("latch", "STATE_CHANGED_NIGHT_LOCK", BoltState.NIGHT_LOCK),
+        ("latch", "STATE_CHANGED_NIGHT_LOCK_REMOTE", BoltState.NIGHT_LOCK_REMOTE),
+        ("latch", "GO_TO_STATE_MANUAL_LOCK_REMOTE_NIGHT_LOCK", BoltState.LOCKING),
+        ("night_lock", "GO_TO_STATE_MANUAL_LOCK_REMOTE_NIGHT_LOCK", "night_lock"),
+        ("night_lock", "GO_TO_STATE_MANUAL_UNLOCK_REMOTE_LATCH", BoltState.UNLOCKING),
+        ("latch", "GO_TO_STATE_INSTANTOPEN_OPEN", BoltState.OPENING),
+        ("night_lock", "STATE_CHANGED_LATCH_REMOTE", BoltState.LATCH_REMOTE),
+        ("night_lock", "STATE_CHANGED_SOMETHING_NEW", "something_new"),
+    ],
+)
+def test_update_webhook_bolt_state(
+    bolt_state: str, event_type: str, expected: str
+) -> None:
+    """The bolt state follows the event type of state and transition messages."""
+    state = _lock_state(bolt_state)
+    message: Any = {"event_type": event_type, "key_local_id": 3}
+
+    assert state.update_webhook(message, NOW) == event_type
+    assert state.bolt_state == expected
+    assert state.last_key_id == 3
+
+
+def test_update_webhook_battery() -> None:
+    """Battery messages only change the battery."""
+    state = _lock_state("latch")
+    message: Any = {"battery_percentage": 20, "battery_type": "alkaline"}
+
+    assert state.update_webhook(message, NOW) == "BATTERY"
+
+    assert (state.battery_percentage, state.battery_type) == (20, "alkaline")
+    assert state.bolt_state == BoltState.LATCH
+    assert state.last_key_id is None
+
+
+def test_update_webhook_ble_strength() -> None:
+    """Bluetooth signal strength messages only change the signal strength."""
+    state = _lock_state("latch")
+    message: Any = {"mac_wifi": "aa:bb", "mac_ble": "aa:bb", "ble_strength": -80}
+
+    assert state.update_webhook(message, NOW) == "BLE_STRENGTH"
+
+    assert state.ble_strength == -80
+    assert state.bolt_state == BoltState.LATCH
+
+
+def test_update_webhook_online_status() -> None:
+    """Online status messages only change the online status."""
+    state = _lock_state("latch")
+    message: Any = {"mac_wifi": "aa:bb", "mac_ble": "aa:bb", "lock_online": 0}
+
+    assert state.update_webhook(message, NOW) == "ONLINE_STATUS"
+    assert state.lock_online == 0
+    assert state.bolt_state == BoltState.LATCH
+
+
+@pytest.mark.parametrize("message", [{}, {"mac_wifi": "aa:bb"}, {"event_type": 1}])
+def test_update_webhook_unknown_message(message: Any) -> None:
+    """Messages of an unknown shape change nothing."""
+    state = _lock_state("latch")
+
+    assert state.update_webhook(message, NOW) is None
+    assert state.bolt_state == BoltState.LATCH
+    assert state.last_event is None
+
+
+@pytest.mark.parametrize(
+    ("bolt_state", "expected"),
+    [("day_lock", BoltState.DAY_LOCK), ("something_new", "something_new")],
+)
+def test_status_bolt_state(bolt_state: str, expected: str) -> None:
+    """Bolt states the integration does not know are kept as reported."""
+    assert _lock_state(bolt_state).bolt_state == expected
@@ -0,0 +1,122 @@
+"""Tests for profiling the LOQED integration."""
+import asyncio
+import cProfile
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.loqed.const import COMMAND_METHODS, DOMAIN
+from custom_components.loqed.profiling import LoqedProfiler, _profile_coroutine
+
+
+class FakeClient:
+    """Bridge client with the profiled command methods."""
+
+    async def open_lock(self) -> str:
+        """Open the lock."""
+        return "open"
+
+    async def lock_lock(self) -> str:
+        """Lock the lock."""
+        return "lock"
+
+    async def latch_lock(self) -> str:
+        """Unlock the lock."""
+        return "latch"
+
+
+class FakeCoordinator:
+    """Coordinator recording the webhook handlers that are set."""
+
+    def __init__(self) -> None:
+        """Initialize the coordinator."""
+        self.client = FakeClient()
+        self.handlers: list[Any] = []
+
+    def async_set_webhook_handler(self, handler: Any) -> None:
+        """Register the handler of the webhook."""
+        self.handlers.append(handler)
+
+    async def _handle_webhook(self, *args: Any) -> None:
+        """Handle a webhook."""
+
+    async def _async_update_data(self) -> str:
+        """Fetch the status of the lock."""
+        return "status"
+
+
+def test_profile_coroutine_passes_through_exceptions() -> None:
+    """Results and exceptions of the profiled coroutine are passed on."""
+
+    async def succeed() -> str:
+        await asyncio.sleep(0)
+        return "done"
+
+    async def fail() -> None:
+        await asyncio.sleep(0)
+        raise ValueError("failed")
+
+    async def run() -> None:
+        profile = cProfile.Profile()
+        assert await _profile_coroutine(profile, succeed()) == "done"
+        with pytest.raises(ValueError, match="failed"):
+            await _profile_coroutine(profile, fail())
+
+    asyncio.run(run())
+
+
+def test_profile_coroutine_passes_through_cancellation() -> None:
+    """Cancelling the task cancels the profiled coroutine."""
+    cancelled = False
+
+    async def wait() -> None:
+        nonlocal cancelled
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    async def run() -> None:
+        task = asyncio.ensure_future(_profile_coroutine(cProfile.Profile(), wait()))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert cancelled
+
+
+def test_stop_restores_methods(tmp_path: Path) -> None:
+    """Stopping restores the methods and only re-registers loaded locks."""
+    loaded, unloaded = FakeCoordinator(), FakeCoordinator()
+    path = tmp_path / "loqed_profile.cprof"
+
+    async def run() -> None:
+        hass = HomeAssistant(str(tmp_path))
+        hass.data[DOMAIN] = {"entry": loaded}
+        profiler = LoqedProfiler(hass, [loaded, unloaded], str(path), 5)
+
+        profiler.async_start(timedelta(minutes=1))
+        for coordinator in (loaded, unloaded):
+            assert "_async_update_data" in vars(coordinator)
+            assert set(COMMAND_METHODS.values()) <= set(vars(coordinator.client))
+        assert await loaded.client.lock_lock() == "lock"
+        assert await loaded._async_update_data() == "status"
+
+        await profiler.async_stop()
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
+
+    for coordinator in (loaded, unloaded):
+        assert "_async_update_data" not in vars(coordinator)
+        assert not vars(coordinator.client)
+    assert loaded.handlers[1:] == [loaded._handle_webhook]
+    assert len(unloaded.handlers) == 1
+    assert path.exists()
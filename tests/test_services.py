@@ -0,0 +1,261 @@
+"""Tests for the LOQED services."""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+import aiohttp
+import pytest
+
+from homeassistant import config_entries
+from homeassistant.auth import auth_manager_from_config
+from homeassistant.auth.const import GROUP_ID_READ_ONLY
+from homeassistant.auth.models import User
+from homeassistant.core import Context, HomeAssistant
+from homeassistant.exceptions import HomeAssistantError, Unauthorized
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+
+from custom_components.loqed import services
+from custom_components.loqed.const import DOMAIN
+from custom_components.loqed.services import async_group_command, async_setup_services
+
+
+class FakeClient:
+    """Bridge client that records how many commands are in flight."""
+
+    def __init__(self, tracker: Counter[str], ip_address: str, failures: int = 0):
+        """Initialize the client, failing the first `failures` commands."""
+        self.tracker = tracker
+        self.ip_address = ip_address
+        self.failures = failures
+        self.calls = 0
+
+    async def lock_lock(self) -> None:
+        """Send a lock command."""
+        self.calls += 1
+        self.tracker[self.ip_address] += 1
+        self.tracker["total"] += 1
+        self.tracker["max total"] = max(
+            self.tracker["max total"], self.tracker["total"]
+        )
+        self.tracker["max per bridge"] = max(
+            self.tracker["max per bridge"], self.tracker[self.ip_address]
+        )
+        try:
+            await asyncio.sleep(0.01)
+            if self.failures:
+                self.failures -= 1
+                raise aiohttp.ClientError("bridge unavailable")
+        finally:
+            self.tracker[self.ip_address] -= 1
+            self.tracker["total"] -= 1
+
+
+class FakeCoordinator:
+    """Coordinator holding a fake client."""
+
+    def __init__(self, client: FakeClient, entry_id: str = "") -> None:
+        """Initialize the coordinator."""
+        self.client = client
+        self.entry_id = entry_id
+
+
+def _targets(
+    tracker: Counter[str],
+    bridges: int,
+    per_bridge: int,
+    failures: int = 0,
+    name: str = "lock",
+) -> dict[str, Any]:
+    return {
+        f"lock.{name}_{bridge}_{index}": FakeCoordinator(
+            FakeClient(tracker, f"10.0.0.{bridge}", failures)
+        )
+        for bridge in range(bridges)
+        for index in range(per_bridge)
+    }
+
+
+def test_group_command_limits_concurrency() -> None:
+    """Commands stay within the total and per-bridge limits."""
+    tracker: Counter[str] = Counter()
+    targets = _targets(tracker, bridges=4, per_bridge=3)
+
+    results = asyncio.run(async_group_command(targets, "lock", 3, 1, 0))
+
+    assert tracker["max per bridge"] == 1
+    assert tracker["max total"] == 3
+    assert all(result["success"] for result in results.values())
+    assert {result["attempts"] for result in results.values()} == {1}
+
+
+def test_group_command_retries_only_failures() -> None:
+    """Locks that failed are retried, the others are not."""
+    tracker: Counter[str] = Counter()
+    targets = _targets(tracker, bridges=1, per_bridge=1, failures=1, name="failing")
+    targets.update(_targets(tracker, bridges=2, per_bridge=1))
+    failing = "lock.failing_0_0"
+
+    results = asyncio.run(async_group_command(targets, "lock", 10, 1, 1))
+
+    assert results[failing] == {
+        "success": True,
+        "attempts": 2,
+        "latency": results[failing]["latency"],
+        "error": None,
+    }
+    assert results["lock.lock_1_0"]["attempts"] == 1
+    assert targets["lock.lock_1_0"].client.calls == 1
+
+
+def test_group_command_gives_up_after_retries() -> None:
+    """Locks that keep failing report the last error."""
+    tracker: Counter[str] = Counter()
+    targets = _targets(tracker, bridges=1, per_bridge=1, failures=5)
+
+    results = asyncio.run(async_group_command(targets, "lock", 10, 1, 2))
+
+    assert results["lock.lock_0_0"]["success"] is False
+    assert results["lock.lock_0_0"]["attempts"] == 3
+    assert results["lock.lock_0_0"]["error"] == "bridge unavailable"
+
+
+def test_group_command_timeout(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Commands that take too long fail with a timeout."""
+    monkeypatch.setattr(services, "COMMAND_TIMEOUT", 0.001)
+    tracker: Counter[str] = Counter()
+    targets = _targets(tracker, bridges=1, per_bridge=1)
+
+    results = asyncio.run(async_group_command(targets, "lock", 10, 1, 0))
+
+    assert results["lock.lock_0_0"]["error"] == "TimeoutError"
+
+
+async def _async_setup(
+    config_dir: Path, failures: int
+) -> tuple[HomeAssistant, str, User]:
+    """Set up the services with a single lock and a user without permissions."""
+    hass = HomeAssistant(str(config_dir))
+    hass.auth = await auth_manager_from_config(hass, [], [])
+    await dr.async_load(hass)
+    await er.async_load(hass)
+    entry = config_entries.ConfigEntry(
+        version=1, domain=DOMAIN, title="Lock", data={}, source="user"
+    )
+    entity_id = er.async_get(hass).async_get_or_create(
+        "lock", DOMAIN, "aa:bb:cc:dd:ee:ff", config_entry=entry
+    ).entity_id
+    client = FakeClient(Counter(), "10.0.0.1", failures)
+    hass.data[DOMAIN] = {entry.entry_id: FakeCoordinator(client, entry.entry_id)}
+    async_setup_services(hass)
+    # The first user becomes the owner, who is allowed everything
+    await hass.auth.async_create_user("Owner")
+    user = await hass.auth.async_create_user("Guest", group_ids=[GROUP_ID_READ_ONLY])
+    return hass, entity_id, user
+
+
+def test_group_command_service_raises_without_response(tmp_path: Path) -> None:
+    """Failures raise when no response is requested."""
+
+    async def run() -> None:
+        hass, entity_id, _ = await _async_setup(tmp_path, failures=5)
+        data = {"entity_id": entity_id, "command": "lock", "retries": 0}
+
+        response = await hass.services.async_call(
+            DOMAIN, "group_command", data, blocking=True, return_response=True
+        )
+        assert response["results"][entity_id]["success"] is False
+
+        with pytest.raises(HomeAssistantError, match=f"Failed to lock {entity_id}"):
+            await hass.services.async_call(DOMAIN, "group_command", data, blocking=True)
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
+
+
+def test_group_command_service_checks_permissions(tmp_path: Path) -> None:
+    """Users need control permission for every lock."""
+
+    async def run() -> None:
+        hass, entity_id, user = await _async_setup(tmp_path, failures=0)
+
+        with pytest.raises(Unauthorized):
+            await hass.services.async_call(
+                DOMAIN,
+                "group_command",
+                {"entity_id": entity_id, "command": "lock"},
+                blocking=True,
+                context=Context(user_id=user.id),
+            )
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["configuration.yaml", "secrets.yaml", "../loqed.capture", "/tmp/loqed.capture"],
+)
+def test_capture_path_is_restricted(tmp_path: Path, path: str) -> None:
+    """Captures are limited to capture files in the capture directory."""
+
+    async def run() -> None:
+        hass, entity_id, _ = await _async_setup(tmp_path, failures=0)
+
+        with pytest.raises(HomeAssistantError, match="must be a file name ending"):
+            await hass.services.async_call(
+                DOMAIN,
+                "start_recording",
+                {"entity_id": entity_id, "path": path},
+                blocking=True,
+            )
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    ("service", "data"),
+    [
+        ("start_recording", {}),
+        ("stop_recording", {}),
+        ("replay_capture", {"path": "loqed.capture"}),
+    ],
+)
+def test_capture_services_require_admin(
+    tmp_path: Path, service: str, data: dict[str, Any]
+) -> None:
+    """Only administrators can record and replay captures."""
+
+    async def run() -> None:
+        hass, entity_id, user = await _async_setup(tmp_path, failures=0)
+
+        with pytest.raises(Unauthorized):
+            await hass.services.async_call(
+                DOMAIN,
+                service,
+                {"entity_id": entity_id, **data},
+                blocking=True,
+                context=Context(user_id=user.id),
+            )
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("service", ["start_profiling", "stop_profiling"])
+def test_profiling_services_require_admin(tmp_path: Path, service: str) -> None:
+    """Only administrators can profile."""
+
+    async def run() -> None:
+        hass, _, user = await _async_setup(tmp_path, failures=0)
+
+        with pytest.raises(Unauthorized):
+            await hass.services.async_call(
+                DOMAIN, service, blocking=True, context=Context(user_id=user.id)
+            )
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())